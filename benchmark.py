@@ -0,0 +1,291 @@
+"""
+Benchmarks the image generation stages on synthetic clips.
+
+Results are written to a JSON file so runs of different versions can be compared, i.e.
+
+    python benchmark.py --resolutions 1080p 4k --counts 10 20 --output results.json
+"""
+
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+from argparse import ArgumentParser
+from collections.abc import Callable
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from time import perf_counter
+
+import vapoursynth as vs
+
+from frame_forge import GenerateImages
+from frame_forge.synthetic import synthetic_pair
+from frame_forge.utils import run_async
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+
+SYNC_STYLE = (
+    "Segoe UI,25,&H31FF31&,&H00000000,&H00000000,&H00000000,"
+    "1,0,0,0,100,100,0,0,1,1,0,7,10,10,10,1"
+)
+
+
+def make_generator(
+    source: vs.VideoNode,
+    encode: vs.VideoNode,
+    image_dir: Path,
+    comparison_count: int,
+    **kwargs,
+) -> GenerateImages:
+    """GenerateImages for injected clips with the CLI defaults"""
+    options = {
+        "source_file": Path("synthetic_source.mkv"),
+        "encode_file": Path("synthetic_encode.mkv"),
+        "fpng_compression": 1,
+        "frames": None,
+        "image_dir": image_dir,
+        "indexer": "lsmash",
+        "img_lib": "fpng",
+        "source_index_path": None,
+        "encode_index_path": None,
+        "left_crop": None,
+        "right_crop": None,
+        "top_crop": None,
+        "bottom_crop": None,
+        "adv_resize_left": None,
+        "adv_resize_right": None,
+        "adv_resize_top": None,
+        "adv_resize_bottom": None,
+        "tone_map": False,
+        "re_sync": None,
+        "comparison_count": comparison_count,
+        "start_trim": 12,
+        "end_trim": 12,
+        "sub_size": 20,
+        "sub_alignment": 7,
+        "sub_color": None,
+        "sub_secondary_color": None,
+        "sub_outline_color": None,
+        "sub_back_color": None,
+        "sub_font_name": "Segoe UI",
+        "sub_bold": 1,
+        "sub_italic": 0,
+        "sub_underline": 0,
+        "sub_strikeout": 0,
+        "sub_scale_x": 100,
+        "sub_scale_y": 100,
+        "sub_spacing": 0,
+        "sub_border_style": 0,
+        "sub_outline_width": 1,
+        "sub_shadow_depth": 0,
+        "sub_left_margin": 10,
+        "sub_right_margin": 10,
+        "sub_vertical_margin": 10,
+        "source_sub_title": "Source",
+        "release_sub_title": "Encode",
+        "source_node": source,
+        "encode_node": encode,
+    }
+    options.update(kwargs)
+    return GenerateImages(**options)
+
+
+def measure(run: Callable[[], object], repeats: int) -> dict:
+    """Runs the callable `repeats` times (output silenced), returns the timings"""
+    timings = []
+    for _ in range(repeats):
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            start = perf_counter()
+            run()
+            timings.append(perf_counter() - start)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "runs": timings,
+    }
+
+
+def bench_frame_selection(source, encode, work_dir, count, repeats) -> list[dict]:
+    results = []
+    for mode in ("interval", "scene", "diverse"):
+        generator = make_generator(
+            source, encode, work_dir, count, frame_selection=mode
+        )
+        timings = measure(
+            lambda generator=generator: run_async(
+                generator.get_b_frames(
+                    num_source_frames=len(source),
+                    start_trim=generator.start_trim,
+                    end_trim=generator.end_trim,
+                )
+            ),
+            repeats,
+        )
+        results.append({"stage": "frame_selection", "mode": mode, **timings})
+    return results
+
+
+def bench_sync_rendering(source, encode, work_dir, count, repeats) -> list[dict]:
+    generator = make_generator(source, encode, work_dir, count)
+    sync_dir = work_dir / "img_sync"
+    reference_frames = [len(encode) // 3, (len(encode) * 2) // 3]
+
+    def render():
+        ref_jobs = generator.generate_ref_screens(
+            SYNC_STYLE, reference_frames, sync_dir
+        )
+        sync_jobs = generator.generate_sync_screens(
+            [
+                ([frame + i for i in range(-5, 6)], sync_dir / f"sync{idx}")
+                for idx, frame in enumerate(reference_frames, start=1)
+            ],
+            SYNC_STYLE,
+        )
+        generator.render_engine.render_sequences(
+            generator.plan_sequences(sync_jobs, ref_jobs)
+        )
+        shutil.rmtree(sync_dir, ignore_errors=True)
+
+    return [{"stage": "sync_rendering", **measure(render, repeats)}]
+
+
+def bench_process_images(source, encode, work_dir, count, repeats) -> list[dict]:
+    output_dir = work_dir / "output"
+
+    def process():
+        # a fresh generator per run, process_images changes the nodes it's given
+        make_generator(source, encode, output_dir, count).process_images()
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    return [{"stage": "process_images", **measure(process, repeats)}]
+
+
+def bench_move_images(source, encode, work_dir, count, repeats) -> list[dict]:
+    generator = make_generator(source, encode, work_dir, count)
+    output_dir = work_dir / "move_output"
+    output_dir.mkdir(exist_ok=True)
+    # roughly a full run, comparison pairs plus sync windows
+    image_bytes = os.urandom(256 * 1024)
+
+    def stage() -> Path:
+        staging_dir = Path(tempfile.mkdtemp(prefix=".ff_", dir=output_dir))
+        for folder, image_count in (
+            ("img_comparison", count * 2),
+            ("img_sync", 24),
+        ):
+            (staging_dir / folder).mkdir()
+            for idx in range(image_count):
+                (staging_dir / folder / f"{idx:03d}.png").write_bytes(image_bytes)
+        return staging_dir
+
+    timings = []
+    for _ in range(repeats):
+        staging_dir = stage()
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            start = perf_counter()
+            generator.move_images(staging_dir, output_dir)
+            timings.append(perf_counter() - start)
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    return [
+        {
+            "stage": "move_images",
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "runs": timings,
+        }
+    ]
+
+
+BENCHMARKS = {
+    "frame_selection": bench_frame_selection,
+    "sync_rendering": bench_sync_rendering,
+    "process_images": bench_process_images,
+    "move_images": bench_move_images,
+}
+
+
+def environment() -> dict:
+    try:
+        frame_forge_version = version("frame-forge")
+    except PackageNotFoundError:
+        frame_forge_version = "unknown"
+
+    return {
+        "frame_forge": frame_forge_version,
+        "vapoursynth": vs.core.version_number(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "threads": vs.core.num_threads,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark FrameForge on synthetic clips")
+    parser.add_argument(
+        "--resolutions",
+        nargs="+",
+        choices=tuple(RESOLUTIONS),
+        default=["1080p", "4k"],
+        help="Clip resolutions (defaults to 1080p and 4k)",
+    )
+    parser.add_argument(
+        "--counts",
+        nargs="+",
+        type=int,
+        default=[10, 20, 40],
+        help="Comparison counts (defaults to 10 20 40)",
+    )
+    parser.add_argument(
+        "--benchmarks",
+        nargs="+",
+        choices=tuple(BENCHMARKS),
+        default=list(BENCHMARKS),
+        help="Benchmarks to run (defaults to all)",
+    )
+    parser.add_argument(
+        "--length", type=int, default=2400, help="Clip length in frames"
+    )
+    parser.add_argument(
+        "--repeats", type=int, default=3, help="Runs per measurement (defaults to 3)"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="benchmark_results.json",
+        help="Path to the JSON results (defaults to 'benchmark_results.json')",
+    )
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="frame_forge_bench_") as temp_dir:
+        work_dir = Path(temp_dir)
+        for resolution in args.resolutions:
+            width, height = RESOLUTIONS[resolution]
+            source, encode = synthetic_pair(vs.core, width, height, args.length)
+            for count in args.counts:
+                for name in args.benchmarks:
+                    print(f"{name}: {resolution}, {count} comparisons", flush=True)
+                    for result in BENCHMARKS[name](
+                        source, encode, work_dir, count, args.repeats
+                    ):
+                        result.update(resolution=resolution, comparison_count=count)
+                        results.append(result)
+                        print(f"  {result['median']:.3f}s (median)", flush=True)
+
+    output = Path(args.output)
+    output.write_text(
+        json.dumps({"environment": environment(), "results": results}, indent=2)
+    )
+    print(f"\nResults written to {output}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
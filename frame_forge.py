@@ -1,8 +1,14 @@
 import sys
+from dataclasses import fields
+from multiprocessing import freeze_support
 from pathlib import Path
 from argparse import ArgumentParser
 from frame_forge import GenerateImages
+from frame_forge.config import FrameForgeConfig
 from frame_forge.exceptions import FrameForgeError
+from frame_forge.png import PNG_FILTER_CHOICES, ZLIB_STRATEGIES
+from frame_forge.progress import ProgressReporter, open_progress_stream
+from frame_forge.render import THUMBNAIL_FORMATS
 from frame_forge.utils import exit_application, restricted_int
 from frame_forge.cli_utils import frame_list
 
@@ -12,6 +18,9 @@ __version__ = "1.4.0"
 
 
 if __name__ == "__main__":
+    # required for the indexing worker processes in the frozen executable
+    freeze_support()
+
     parser = ArgumentParser(prog=program_name)
 
     parser.add_argument(
@@ -44,9 +53,61 @@ if __name__ == "__main__":
     parser.add_argument(
         "--img-lib",
         type=str,
-        choices=["imwri", "fpng"],
+        choices=["imwri", "fpng", "zlib"],
         default="fpng",
-        help="Image library to use",
+        help="Image library to use ('zlib' is the built-in multi-threaded PNG encoder)",
+    )
+    parser.add_argument(
+        "--png-compression",
+        type=restricted_int(0, 9),
+        default=6,
+        help="zlib compression level for '--img-lib zlib' [choices 0 - 9] "
+        "(defaults to '6')",
+    )
+    parser.add_argument(
+        "--png-filter",
+        type=str,
+        choices=PNG_FILTER_CHOICES,
+        default="adaptive",
+        help="PNG row filter for '--img-lib zlib' (defaults to 'adaptive')",
+    )
+    parser.add_argument(
+        "--png-strategy",
+        type=str,
+        choices=tuple(ZLIB_STRATEGIES),
+        default="default",
+        help="zlib strategy for '--img-lib zlib' (defaults to 'default')",
+    )
+    parser.add_argument(
+        "--optimize-png",
+        action="store_true",
+        help="Recompress finished images in the background with stronger deflate "
+        "settings, only smaller results are kept (pairs well with --fpng-compression 0)",
+    )
+    parser.add_argument(
+        "--optimize-workers",
+        type=int,
+        help="Number of processes for --optimize-png (defaults to half the CPU threads)",
+    )
+    parser.add_argument(
+        "--thumbnail-width",
+        type=int,
+        help="Also write a thumbnail of each comparison image at this width (aspect "
+        "ratio is kept) into 'img_thumbnails', made from the same decoded frame",
+    )
+    parser.add_argument(
+        "--thumbnail-format",
+        type=str,
+        choices=tuple(THUMBNAIL_FORMATS),
+        default="png",
+        help="Thumbnail image format (defaults to 'png')",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Compute PSNR, SSIM and mean absolute error (luma, before the overlays) "
+        "for each comparison pair from the frames already decoded for the images, "
+        "written to 'metrics.json' in the output folder",
     )
     parser.add_argument(
         "--source-index-path", type=str, help="Path to look/create indexes for source"
@@ -54,6 +115,30 @@ if __name__ == "__main__":
     parser.add_argument(
         "--encode-index-path", type=str, help="Path to look/create indexes for encode"
     )
+    parser.add_argument(
+        "--index-cache-dir",
+        type=str,
+        help="Shared directory to cache indexes in (keyed by file content instead of "
+        "writing indexes next to the media)",
+    )
+    parser.add_argument(
+        "--index-cache-size",
+        type=float,
+        default=10,
+        help="Maximum size of the index cache in GiB, least recently used indexes are "
+        "removed first (defaults to 10)",
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=int,
+        help="Memory budget in MiB, sizes VapourSynth's frame cache and limits how many "
+        "frames are processed at once to stay within it",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        help="Number of VapourSynth threads (defaults to the number of CPU threads)",
+    )
     parser.add_argument("--left-crop", type=int, help="Left crop")
     parser.add_argument("--right-crop", type=int, help="Right crop")
     parser.add_argument("--top-crop", type=int, help="Top crop")
@@ -70,6 +155,82 @@ if __name__ == "__main__":
         type=str,
         help="Sync offset for image generation in frames (i.e. --re-sync=-3)",
     )
+    parser.add_argument(
+        "--auto-sync",
+        action="store_true",
+        help="Detect the sync offset automatically by comparing downscaled frames "
+        "around a few points of the video (falls back to --re-sync if ambiguous)",
+    )
+    parser.add_argument(
+        "--drift-map",
+        action="store_true",
+        help="Map encode frames to source frames piecewise (for cut logos, VFR sections "
+        "or dropped frames) from frame timestamps and sparse fingerprint matching, "
+        "the map is cached per source/encode pair",
+    )
+    parser.add_argument(
+        "--auto-sync-range",
+        type=restricted_int(1, 500),
+        default=30,
+        help="Largest offset in frames searched by --auto-sync/--drift-map in either "
+        "direction [choices 1 - 500] (defaults to '30')",
+    )
+    parser.add_argument(
+        "--frame-selection",
+        type=str,
+        choices=("interval", "scene", "diverse"),
+        default="interval",
+        help="How comparison frames are picked, 'interval' spaces them evenly, 'scene' "
+        "prefers detailed frames away from scene changes, fades and black frames near "
+        "each interval point, 'diverse' clusters a few hundred sampled frames by their "
+        "luma/chroma histograms and uses one frame per cluster (defaults to 'interval')",
+    )
+    parser.add_argument(
+        "--filter-frames",
+        action="store_true",
+        help="Reject black, flat (i.e. credits on black) and near-duplicate comparison "
+        "frames, replacements are searched for in the same interval",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write wall/CPU time, peak memory and per-frame decode/encode latencies of "
+        "each stage to profile.json in the output folder",
+    )
+    parser.add_argument(
+        "--profile-cprofile",
+        action="store_true",
+        help="With --profile, also dump cProfile stats of the slowest stage next to "
+        "profile.json (adds overhead)",
+    )
+    parser.add_argument(
+        "--progress-json",
+        type=str,
+        nargs="?",
+        const="-",
+        help="Write progress events as JSON lines to stdout ('-', the default), a file "
+        "descriptor ('fd:3') or a file, human output moves to stderr when it's stdout",
+    )
+    parser.add_argument(
+        "--serve",
+        type=str,
+        metavar="ADDRESS",
+        help="Run as a service accepting comparison jobs (POST /jobs) on a Unix socket "
+        "('unix:/path/to/socket') or an HTTP port ('[host:]port'), the other options "
+        "are the job defaults",
+    )
+    parser.add_argument(
+        "--node-cache-size",
+        type=restricted_int(1, 64),
+        default=8,
+        help="Number of opened source/encode files the service keeps warm (defaults "
+        "to 8)",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Drop the human readable progress output (errors are still printed)",
+    )
     parser.add_argument(
         "--comparison-count", type=int, help="Amount of comparisons to generate"
     )
@@ -229,6 +390,43 @@ if __name__ == "__main__":
         parser.print_help()
         exit_application("", 1)
 
+    progress = ProgressReporter(
+        open_progress_stream(args.progress_json) if args.progress_json else None,
+        quiet=args.quiet,
+    )
+
+    if args.serve:
+        # imported here so a regular run doesn't pay for the server modules
+        from frame_forge.api import FrameForge
+        from frame_forge.service import FrameForgeService, serve
+
+        # the config fields share the argument names
+        options = {
+            field.name: getattr(args, field.name)
+            for field in fields(FrameForgeConfig)
+            if hasattr(args, field.name)
+        }
+        options.update(
+            comparison_count=args.comparison_count or 20,
+            release_sub_title=args.encode_sub_title,
+            image_dir=Path(args.image_dir) if args.image_dir else None,
+        )
+        with progress.human_output():
+            try:
+                serve(
+                    args.serve,
+                    FrameForgeService(
+                        FrameForge(
+                            FrameForgeConfig(**options),
+                            progress=progress,
+                            node_cache_size=args.node_cache_size,
+                        )
+                    ),
+                )
+            except FrameForgeError as ff_error:
+                exit_application(str(ff_error), 1)
+            exit_application("\nService stopped", 0)
+
     if not args.source or not Path(args.source).is_file():
         exit_application(
             "Source input is not detected (--source 'path to file')",
@@ -266,70 +464,97 @@ if __name__ == "__main__":
             file=sys.stderr,
         )
 
-    try:
-        img_generator = GenerateImages(
-            source_file=Path(args.source),
-            encode_file=Path(args.encode),
-            fpng_compression=args.fpng_compression,
-            frames=args.frames,
-            image_dir=image_dir,
-            indexer=args.indexer,
-            img_lib=args.img_lib,
-            source_index_path=args.source_index_path,
-            encode_index_path=args.encode_index_path,
-            left_crop=args.left_crop,
-            right_crop=args.right_crop,
-            top_crop=args.top_crop,
-            bottom_crop=args.bottom_crop,
-            adv_resize_left=args.adv_resize_left,
-            adv_resize_right=args.adv_resize_right,
-            adv_resize_top=args.adv_resize_top,
-            adv_resize_bottom=args.adv_resize_bottom,
-            tone_map=args.tone_map,
-            re_sync=args.re_sync,
-            comparison_count=int(args.comparison_count)
-            if args.comparison_count
-            else 20,
-            start_trim=int(args.start_trim),
-            end_trim=int(args.end_trim),
-            sub_size=args.sub_size,
-            sub_alignment=args.sub_alignment,
-            sub_color=args.sub_color,
-            sub_secondary_color=args.sub_secondary_color,
-            sub_outline_color=args.sub_outline_color,
-            sub_back_color=args.sub_back_color,
-            sub_font_name=args.sub_font_name,
-            sub_bold=args.sub_bold,
-            sub_italic=args.sub_italic,
-            sub_underline=args.sub_underline,
-            sub_strikeout=args.sub_strikeout,
-            sub_scale_x=args.sub_scale_x,
-            sub_scale_y=args.sub_scale_y,
-            sub_spacing=args.sub_spacing,
-            sub_border_style=args.sub_border_style,
-            sub_outline_width=args.sub_outline_width,
-            sub_shadow_depth=args.sub_shadow_depth,
-            sub_left_margin=args.sub_left_margin,
-            sub_right_margin=args.sub_right_margin,
-            sub_vertical_margin=args.sub_vertical_margin,
-            source_sub_title=args.source_sub_title,
-            release_sub_title=args.encode_sub_title,
-        )
-        if img_generator:
-            try:
-                img_gen = img_generator.process_images()
-                if img_gen:
-                    exit_application(f"\nOutput: {img_gen}", 0)
-            except FrameForgeError as ff_error:
-                img_generator.clean_temp(False)
-                exit_application(str(ff_error), 1)
-            except Exception as except_error:
-                img_generator.clean_temp(False)
-                exit_application(f"Unhandled Exception: {except_error}", 1)
-            except KeyboardInterrupt:
-                img_generator.clean_temp(False)
-                exit_application("KeyboardInterrupt, exiting...", 1)
-            finally:
-                img_generator.clean_temp(False)
-    except Exception as init_error:
-        exit_application(f"Initiation Error: {init_error}", 1)
+    with progress.human_output():
+        try:
+            img_generator = GenerateImages(
+                source_file=Path(args.source),
+                encode_file=Path(args.encode),
+                fpng_compression=args.fpng_compression,
+                frames=args.frames,
+                image_dir=image_dir,
+                indexer=args.indexer,
+                img_lib=args.img_lib,
+                source_index_path=args.source_index_path,
+                encode_index_path=args.encode_index_path,
+                left_crop=args.left_crop,
+                right_crop=args.right_crop,
+                top_crop=args.top_crop,
+                bottom_crop=args.bottom_crop,
+                adv_resize_left=args.adv_resize_left,
+                adv_resize_right=args.adv_resize_right,
+                adv_resize_top=args.adv_resize_top,
+                adv_resize_bottom=args.adv_resize_bottom,
+                tone_map=args.tone_map,
+                re_sync=args.re_sync,
+                comparison_count=int(args.comparison_count)
+                if args.comparison_count
+                else 20,
+                start_trim=int(args.start_trim),
+                end_trim=int(args.end_trim),
+                sub_size=args.sub_size,
+                sub_alignment=args.sub_alignment,
+                sub_color=args.sub_color,
+                sub_secondary_color=args.sub_secondary_color,
+                sub_outline_color=args.sub_outline_color,
+                sub_back_color=args.sub_back_color,
+                sub_font_name=args.sub_font_name,
+                sub_bold=args.sub_bold,
+                sub_italic=args.sub_italic,
+                sub_underline=args.sub_underline,
+                sub_strikeout=args.sub_strikeout,
+                sub_scale_x=args.sub_scale_x,
+                sub_scale_y=args.sub_scale_y,
+                sub_spacing=args.sub_spacing,
+                sub_border_style=args.sub_border_style,
+                sub_outline_width=args.sub_outline_width,
+                sub_shadow_depth=args.sub_shadow_depth,
+                sub_left_margin=args.sub_left_margin,
+                sub_right_margin=args.sub_right_margin,
+                sub_vertical_margin=args.sub_vertical_margin,
+                source_sub_title=args.source_sub_title,
+                release_sub_title=args.encode_sub_title,
+                index_cache_dir=args.index_cache_dir,
+                index_cache_size=args.index_cache_size,
+                memory_limit=args.memory_limit,
+                threads=args.threads,
+                png_compression=args.png_compression,
+                png_filter=args.png_filter,
+                png_strategy=args.png_strategy,
+                optimize_png=args.optimize_png,
+                optimize_workers=args.optimize_workers,
+                thumbnail_width=args.thumbnail_width,
+                thumbnail_format=args.thumbnail_format,
+                auto_sync=args.auto_sync,
+                auto_sync_range=args.auto_sync_range,
+                drift_map=args.drift_map,
+                metrics=args.metrics,
+                frame_selection=args.frame_selection,
+                filter_frames=args.filter_frames,
+                profile=args.profile,
+                profile_cprofile=args.profile_cprofile,
+                progress=progress,
+            )
+            if img_generator:
+                try:
+                    img_gen = img_generator.process_images()
+                    if img_gen:
+                        exit_application(f"\nOutput: {img_gen}", 0)
+                except FrameForgeError as ff_error:
+                    img_generator.clean_temp(False)
+                    progress.emit("error", message=str(ff_error))
+                    exit_application(str(ff_error), 1)
+                except Exception as except_error:
+                    img_generator.clean_temp(False)
+                    progress.emit(
+                        "error", message=f"Unhandled Exception: {except_error}"
+                    )
+                    exit_application(f"Unhandled Exception: {except_error}", 1)
+                except KeyboardInterrupt:
+                    img_generator.clean_temp(False)
+                    progress.emit("error", message="KeyboardInterrupt")
+                    exit_application("KeyboardInterrupt, exiting...", 1)
+                finally:
+                    img_generator.clean_temp(False)
+        except Exception as init_error:
+            progress.emit("error", message=f"Initiation Error: {init_error}")
+            exit_application(f"Initiation Error: {init_error}", 1)
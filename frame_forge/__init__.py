@@ -3,15 +3,54 @@ import re
 import shutil
 import numpy as np
 import tempfile
+import time
+from contextlib import contextmanager
+from functools import partial
 from random import choice, randint
 from pathlib import Path
 from time import sleep
 from typing import Tuple
 
 import vapoursynth as vs
-from awsmfunc import ScreenGenEncoder, ScreenGen, FrameInfo, DynamicTonemap
+from awsmfunc import ScreenGenEncoder, FrameInfo, DynamicTonemap
+from frame_forge.auto_sync import detect_offset
+from frame_forge.drift_map import DriftMap, DriftMapper
 from frame_forge.exceptions import FrameForgeError
-from frame_forge.utils import get_working_dir, hex_to_bgr, run_async
+from frame_forge.governor import ResourceGovernor
+from frame_forge.metrics import MetricsCollector, metrics_node
+from frame_forge.node_cache import EncodeEntry, NodeCache, SourceEntry, file_key
+from frame_forge.frame_selection import (
+    CandidateFilter,
+    FrameScorer,
+    select_diverse_frames,
+)
+from frame_forge.frame_type_cache import FrameTypeCache
+from frame_forge.index_cache import IndexCache
+from frame_forge.index_parser import read_index_info
+from frame_forge.planner import FrameAccessPlanner
+from frame_forge.png import PngEncoder
+from frame_forge.png_optimizer import PngOptimizer
+from frame_forge.profiler import StageProfiler
+from frame_forge.progress import ProgressReporter
+from frame_forge.indexing import build_indexes
+from frame_forge.render import (
+    ZLIB_ENCODER,
+    DecodeJob,
+    GenerationResult,
+    RenderEngine,
+    RenderJob,
+)
+from frame_forge.utils import (
+    hex_to_bgr,
+    load_plugins,
+    partial_file_hash,
+    run_async,
+)
+
+
+# everything a run writes to the output folder, previous results are replaced as a whole
+OUTPUT_FOLDERS = ("img_comparison", "img_selected", "img_sync", "img_thumbnails")
+OUTPUT_FILE_PATTERNS = ("metrics.json", "profile.json", "profile_*.prof")
 
 
 class GenerateImages:
@@ -61,17 +100,51 @@ class GenerateImages:
         sub_vertical_margin: int,
         source_sub_title: str,
         release_sub_title: str,
+        index_cache_dir: None | str = None,
+        index_cache_size: float = 10,
+        memory_limit: None | int = None,
+        threads: None | int = None,
+        png_compression: int = 6,
+        png_filter: str = "adaptive",
+        png_strategy: str = "default",
+        optimize_png: bool = False,
+        optimize_workers: None | int = None,
+        thumbnail_width: None | int = None,
+        thumbnail_format: str = "png",
+        auto_sync: bool = False,
+        auto_sync_range: int = 30,
+        drift_map: bool = False,
+        metrics: bool = False,
+        frame_selection: str = "interval",
+        filter_frames: bool = False,
+        source_node: vs.VideoNode | None = None,
+        encode_node: vs.VideoNode | None = None,
+        profile: bool = False,
+        profile_cprofile: bool = False,
+        progress: ProgressReporter | None = None,
+        output: str = "files",
+        core: vs.Core | None = None,
+        node_cache: NodeCache | None = None,
     ):
         self.source_file = source_file
-        self.source_node = None
-        self.reference_source_file = None
+        self.source_node = source_node
+        self.reference_source_file = source_node
         self.encode_file = encode_file
         self.fpng_compression = fpng_compression
         self.frames = frames
-        self.encode_node = None
+        self.encode_node = encode_node
+        # prebuilt nodes (i.e. synthetic clips) skip indexing and all index based caches
+        self.injected_nodes = source_node is not None and encode_node is not None
+        self.encode_pict_types: bytes | None = None
+        self.source_keyframes: np.ndarray | None = None
+        self.encode_keyframes: np.ndarray | None = None
+        self.source_decode_node = None
+        self.encode_decode_node = None
+        self.encode_frame_type_cache: FrameTypeCache | None = None
+        self.encode_frame_step = 1
         self.image_dir = image_dir
         self.indexer = indexer
-        self.img_lib = ScreenGenEncoder(img_lib)
+        self.img_lib = img_lib if img_lib == ZLIB_ENCODER else ScreenGenEncoder(img_lib)
         self.source_index_path = source_index_path
         self.encode_index_path = encode_index_path
         self.left_crop = left_crop
@@ -84,6 +157,14 @@ class GenerateImages:
         self.adv_resize_bottom = adv_resize_bottom
         self.tone_map = tone_map
         self.re_sync = re_sync
+        self.auto_sync = auto_sync
+        self.auto_sync_range = auto_sync_range
+        self.use_drift_map = drift_map
+        self.drift_map: DriftMap | None = None
+        self.metrics = metrics
+        self.metrics_collector: MetricsCollector | None = None
+        self.frame_selection = frame_selection
+        self.filter_frames = filter_frames
         self.comparison_count = comparison_count
         self.start_trim = start_trim
         self.end_trim = end_trim
@@ -109,20 +190,75 @@ class GenerateImages:
         self.sub_vertical_margin = sub_vertical_margin
         self.source_sub_title = source_sub_title
         self.release_sub_title = release_sub_title
+        self.thumbnail_width = thumbnail_width
+        self.thumbnail_format = thumbnail_format
+        # per stage timings, written to profile.json next to the images
+        self.profiler = StageProfiler(enabled=profile, use_cprofile=profile_cprofile)
+        # JSON lines progress events (disabled unless a stream is given)
+        self.progress = progress or ProgressReporter()
+
+        # a core that's handed in already has the plugins loaded (see FrameForge)
+        self.core = core or vs.core
+        self.governor = ResourceGovernor(self.core, memory_limit, threads)
+        if core is None:
+            self.load_plugins()
+        # opened source/encode nodes shared between runs on the same core
+        self.node_cache = node_cache
+
+        # optional central index cache (size in GiB)
+        self.index_cache = (
+            IndexCache(
+                cache_dir=Path(index_cache_dir),
+                max_bytes=int(index_cache_size * 1024**3),
+                core=self.core,
+                indexer=self.indexer,
+            )
+            if index_cache_dir
+            else None
+        )
 
-        self.core = vs.core
-        self.load_plugins()
+        self.render_engine = RenderEngine(
+            core=self.core,
+            img_lib=self.img_lib,
+            fpng_compression=self.fpng_compression,
+            callback=self.screen_gen_callback,
+            png_encoder=PngEncoder(
+                compression_level=png_compression,
+                filter_name=png_filter,
+                strategy=png_strategy,
+                threads=self.core.num_threads,
+            )
+            if self.img_lib == ZLIB_ENCODER or output == "png"
+            else None,
+            # in-memory images have no files to optimize
+            optimizer=PngOptimizer(workers=optimize_workers)
+            if optimize_png and output == "files"
+            else None,
+            thumbnail_width=self.thumbnail_width,
+            thumbnail_format=self.thumbnail_format,
+            profiler=self.profiler,
+            progress=self.progress,
+            output=output,
+        )
 
         self.temp_dir: Path | None = None
-
-    def process_images(self) -> Path:
-        self.check_index_paths()
-
-        if self.indexer == "lsmash":
-            self.index_lsmash()
-
-        elif self.indexer == "ffms2":
-            self.index_ffms2()
+        # stale external indexes are rebuilt here instead of being overwritten
+        self.index_temp_dir: Path | None = None
+        # index paths picked by check_index_paths, stale ones are replaced in place
+        self.owned_index_paths: set[Path] = set()
+
+    def process_images(self) -> Path | GenerationResult:
+        """
+        Generates the comparison and sync images.
+
+        Returns:
+            (Path | GenerationResult): The output folder, or the images and reports when
+                they're kept in memory (`output` 'png' or 'array')
+        """
+        in_memory = self.render_engine.output != "files"
+        if not self.injected_nodes:
+            with self.stage("indexing"):
+                self.load_sources()
 
         if not self.source_node or not self.encode_node:
             raise AttributeError(
@@ -173,55 +309,116 @@ class GenerateImages:
             size=str(self.sub_size + 5), pos="9"
         )
 
-        self.check_de_interlaced(num_source_frames, num_encode_frames)
+        with self.stage("check_de_interlaced"):
+            self.check_de_interlaced(num_source_frames, num_encode_frames)
+
+        # decode-only requests (used to read forward between planned frames) skip the
+        # crop/resize/tone-map/overlay chain
+        self.source_decode_node = self.source_node
+        self.encode_decode_node = self.encode_node
 
         b_frames = None
         if not self.frames:
-            b_frames = run_async(
-                self.get_b_frames(
-                    num_source_frames=num_source_frames,
-                    start_trim=self.start_trim,
-                    end_trim=self.end_trim,
+            with self.stage("get_b_frames"):
+                b_frames = run_async(
+                    self.get_b_frames(
+                        num_source_frames=num_source_frames,
+                        start_trim=self.start_trim,
+                        end_trim=self.end_trim,
+                    )
                 )
-            )
 
-        (
-            temp_screenshot_comparison_dir,
-            _,
-            temp_screenshot_sync_dir,
-        ) = self.generate_temp_folders()
+        if in_memory:
+            # only used to name the images, nothing is written
+            final_folder = None
+            temp_screenshot_comparison_dir = Path("img_comparison")
+            temp_screenshot_sync_dir = Path("img_sync")
+        else:
+            final_folder = self.generate_final_folder()
+
+            (
+                temp_screenshot_comparison_dir,
+                _,
+                temp_screenshot_sync_dir,
+            ) = self.generate_temp_folders(final_folder)
+
+        with self.stage("prepare_clips"):
+            self.handle_crop()
 
-        self.handle_crop()
+            self.handle_resize()
 
-        self.handle_resize()
+            self.handle_hdr()
 
-        self.handle_hdr()
+            if self.use_drift_map and not self.frames:
+                self.build_drift_map()
+            elif self.auto_sync and not self.frames:
+                self.detect_sync_offset(num_source_frames)
 
-        vs_source_info, vs_encode_info = self.handle_subtitles(selected_sub_style)
+            vs_source_info, vs_encode_info = self.handle_subtitles(selected_sub_style)
 
-        if not self.frames:
-            self.generate_screens(
-                b_frames,
-                vs_source_info,
-                vs_encode_info,
-                temp_screenshot_comparison_dir,
-                temp_screenshot_sync_dir,
-                selected_sub_style_ref,
-                selected_sub_style_sync,
+        self.render_engine.max_in_flight = self.governor.max_in_flight(
+            vs_source_info, vs_encode_info, rgb_output=True
+        )
+
+        # overlays and PNG encoding overlap per frame, their split is in the latencies
+        with self.stage("rendering"):
+            if not self.frames:
+                self.generate_screens(
+                    b_frames,
+                    vs_source_info,
+                    vs_encode_info,
+                    temp_screenshot_comparison_dir,
+                    temp_screenshot_sync_dir,
+                    selected_sub_style_ref,
+                    selected_sub_style_sync,
+                )
+            else:
+                self.generate_exact_screens(
+                    vs_source_info,
+                    vs_encode_info,
+                    temp_screenshot_comparison_dir,
+                )
+
+        if in_memory or final_folder is None:
+            images = sorted(
+                self.render_engine.images.values(), key=lambda image: image.path
             )
-        else:
-            self.generate_exact_screens(
-                vs_source_info,
-                vs_encode_info,
-                temp_screenshot_comparison_dir,
+            self.progress.emit("complete", output=None, images=len(images))
+            return GenerationResult(
+                images=images,
+                metrics=self.metrics_collector.report()
+                if self.metrics_collector
+                else None,
+                profile=self.profiler.report() if self.profiler.enabled else None,
             )
 
-        final_folder = self.generate_final_folder()
-        self.move_images(temp_screenshot_comparison_dir.parent, final_folder)
+        with self.stage("png_optimization"):
+            self.finish_optimization()
+
+        with self.stage("move_images"):
+            self.move_images(temp_screenshot_comparison_dir.parent, final_folder)
         self.clean_temp()
 
+        if self.metrics_collector:
+            self.metrics_collector.write(final_folder / "metrics.json")
+            print("\nQuality metrics written to metrics.json", flush=True)
+
+        if self.profiler.enabled:
+            cprofile_path = self.profiler.write_report(final_folder / "profile.json")
+            print("\nProfile written to profile.json", flush=True)
+            if cprofile_path:
+                print(f"cProfile stats written to {cprofile_path.name}", flush=True)
+
+        self.progress.emit("complete", output=str(final_folder))
+
         return final_folder
 
+    @contextmanager
+    def stage(self, name: str):
+        """Profiles the stage and reports its start/end on the progress stream"""
+        with self.profiler.stage(name), self.progress.stage(name):
+            yield
+
     @staticmethod
     def screen_gen_callback(sg_call_back):
         print(
@@ -229,45 +426,247 @@ class GenerateImages:
             flush=True,
         )
 
+    def frame_label_node(
+        self, clip: vs.VideoNode, label: str, style: str
+    ) -> vs.VideoNode:
+        """Single overlay node that prints the label and frame number on every frame"""
+
+        def add_label(n: int, clip: vs.VideoNode) -> vs.VideoNode:
+            return self.core.sub.Subtitle(
+                clip=clip, text=f"{label}\nFrame: {n}", style=style
+            )
+
+        return self.core.std.FrameEval(clip, partial(add_label, clip=clip))
+
+    def load_sources(self) -> None:
+        """Indexes and opens the source and encode files (warm nodes are reused)"""
+        self.check_index_paths()
+
+        source_warm, encode_warm = self.restore_nodes()
+
+        if self.indexer == "lsmash":
+            self.index_lsmash(source=not source_warm, encode=not encode_warm)
+
+        elif self.indexer == "ffms2":
+            self.index_ffms2(source=not source_warm, encode=not encode_warm)
+
+        self.store_nodes()
+
+        if self.index_cache:
+            self.index_cache.evict(
+                keep=[
+                    Path(self.source_index_path),  # pyright: ignore [reportArgumentType]
+                    Path(self.encode_index_path),  # pyright: ignore [reportArgumentType]
+                    Path(self.encode_index_path).with_suffix(".ffpt"),  # pyright: ignore [reportArgumentType]
+                ]
+            )
+
+    def node_keys(self) -> tuple[tuple, tuple]:
+        """Node cache keys of the source and encode files"""
+        return (
+            ("source", *file_key(self.indexer, self.source_file)),
+            ("encode", *file_key(self.indexer, self.encode_file)),
+        )
+
+    def restore_nodes(self) -> tuple[bool, bool]:
+        """
+        Takes the source/encode nodes (and their index data) from the node cache.
+
+        Returns:
+            (tuple[bool, bool]): Whether the source and the encode were restored
+        """
+        if not self.node_cache:
+            return False, False
+
+        source_key, encode_key = self.node_keys()
+        source_entry = self.node_cache.get(source_key)
+        if isinstance(source_entry, SourceEntry):
+            self.source_node = source_entry.node
+            self.reference_source_file = source_entry.node
+            self.source_keyframes = source_entry.keyframes
+            self.source_index_path = source_entry.index_path
+            print("Using warm source node", flush=True)
+
+        encode_entry = self.node_cache.get(encode_key)
+        if isinstance(encode_entry, EncodeEntry):
+            self.encode_node = encode_entry.node
+            self.encode_pict_types = encode_entry.pict_types
+            self.encode_keyframes = encode_entry.keyframes
+            self.encode_frame_type_cache = encode_entry.frame_type_cache
+            self.encode_index_path = encode_entry.index_path
+            print("Using warm encode node", flush=True)
+
+        return isinstance(source_entry, SourceEntry), isinstance(
+            encode_entry, EncodeEntry
+        )
+
+    def store_nodes(self) -> None:
+        """Adds the opened source/encode nodes to the node cache"""
+        if not self.node_cache or not self.source_node or not self.encode_node:
+            return
+
+        source_key, encode_key = self.node_keys()
+        self.node_cache.put(
+            source_key,
+            SourceEntry(
+                self.source_node,
+                self.source_keyframes,
+                Path(self.source_index_path),  # pyright: ignore [reportArgumentType]
+            ),
+        )
+        self.node_cache.put(
+            encode_key,
+            EncodeEntry(
+                self.encode_node,
+                self.encode_pict_types,
+                self.encode_keyframes,
+                self.encode_frame_type_cache,
+                Path(self.encode_index_path),  # pyright: ignore [reportArgumentType]
+            ),
+        )
+
     def generate_ref_screens(
         self, selected_sub_style_ref, frames: list, screenshot_sync_dir
-    ):
-        """Generates reference frames"""
-        for ref_frame in frames:
-            vs_encode_ref_info = self.core.sub.Subtitle(
-                clip=self.encode_node,
-                text=f"Reference\nFrame: {ref_frame}",
-                style=selected_sub_style_ref,
-            )
-            ScreenGen(
+    ) -> list[RenderJob]:
+        """Generates reference frame jobs"""
+        vs_encode_ref_info = self.frame_label_node(
+            self.encode_node,  # pyright: ignore [reportArgumentType]
+            "Reference",
+            selected_sub_style_ref,
+        )
+        return [
+            RenderJob(
                 vs_encode_ref_info,
-                frame_numbers=[ref_frame],
-                fpng_compression=self.fpng_compression,
-                folder=screenshot_sync_dir,
-                suffix="b_encode__%d",
-                callback=self.screen_gen_callback,
-                encoder=self.img_lib,
+                ref_frame,
+                Path(screenshot_sync_dir) / f"01b_encode__{ref_frame}.png",
             )
+            for ref_frame in sorted(frames)
+        ]
 
     def generate_sync_screens(
-        self, frame_list, selected_sub_style_sync, screenshot_sync_dir
-    ):
-        """Generates sync frames"""
-        for sync_frame in frame_list:
-            vs_sync_info = self.core.sub.Subtitle(
-                clip=self.source_node,
-                text=f"Sync\nFrame: {sync_frame}",
-                style=selected_sub_style_sync,
-            )
-            ScreenGen(
-                vs_sync_info,
-                frame_numbers=[sync_frame],
-                fpng_compression=self.fpng_compression,
-                folder=Path(screenshot_sync_dir),
-                suffix="a_source__%d",
-                callback=self.screen_gen_callback,
-                encoder=self.img_lib,
+        self, sync_windows, selected_sub_style_sync
+    ) -> list[RenderJob]:
+        """Generates sync frame jobs for each (frame_list, screenshot_sync_dir) window"""
+        vs_sync_info = self.frame_label_node(
+            self.source_node,  # pyright: ignore [reportArgumentType]
+            "Sync",
+            selected_sub_style_sync,
+        )
+        jobs = []
+        for frame_list, screenshot_sync_dir in sync_windows:
+            for sync_frame in sorted(frame_list):
+                jobs.append(
+                    RenderJob(
+                        vs_sync_info,
+                        sync_frame,
+                        Path(screenshot_sync_dir) / f"01a_source__{sync_frame}.png",
+                    )
+                )
+        return jobs
+
+    def drift_map_path(self) -> tuple[Path, dict]:
+        """Cache path and key of the drift map for the source/encode pair"""
+        source_hash = partial_file_hash(Path(self.source_file))
+        encode_hash = partial_file_hash(Path(self.encode_file))
+        cache_dir = (
+            self.index_cache.cache_dir
+            if self.index_cache
+            else Path(self.encode_index_path).parent  # pyright: ignore [reportArgumentType]
+        )
+        key = {
+            "source": source_hash,
+            "encode": encode_hash,
+            "encode_frame_step": self.encode_frame_step,
+            "source_frames": len(self.source_node),  # pyright: ignore [reportArgumentType]
+            "max_offset": self.auto_sync_range,
+        }
+        return cache_dir / f"{encode_hash[:16]}-{source_hash[:16]}.ffmap", key
+
+    def build_drift_map(self) -> None:
+        """
+        Loads (or builds and caches) the piecewise encode -> source frame map used for
+        the comparison frames instead of a constant `re_sync`
+        """
+        print("\nBuilding drift map", flush=True)
+        # injected nodes have no files to key the cache with
+        map_path, key = (None, None) if self.injected_nodes else self.drift_map_path()
+
+        if map_path and key:
+            self.drift_map = DriftMap.load(map_path, key)
+            if self.drift_map:
+                print(f"Using cached drift map: {self.drift_map}", flush=True)
+                return
+
+        mapper = DriftMapper(
+            self.core,
+            self.source_node,  # pyright: ignore [reportArgumentType]
+            self.encode_node,  # pyright: ignore [reportArgumentType]
+            max_offset=self.auto_sync_range,
+            in_flight=self.governor.max_in_flight(self.source_node, self.encode_node),
+        )
+        try:
+            self.drift_map = run_async(mapper.build())
+        except ValueError as map_error:
+            print(f"Drift map skipped: {map_error}", flush=True)
+            return
+
+        if map_path and key:
+            self.drift_map.save(map_path, key)
+        print(f"Drift map completed: {self.drift_map}", flush=True)
+
+    def mapped_source_frame(self, encode_frame: int) -> int:
+        """Source frame matching the encode frame (clamped to the source)"""
+        source_frame = self.drift_map.source_frame(encode_frame)  # pyright: ignore [reportOptionalMemberAccess]
+        return min(max(0, source_frame), len(self.source_node) - 1)  # pyright: ignore [reportArgumentType]
+
+    def detect_sync_offset(self, num_source_frames: int, anchor_count: int = 5) -> None:
+        """
+        Detects the source/encode frame offset from frame fingerprints around a few
+        anchors in the trimmed range, the result replaces `re_sync` unless it's ambiguous
+        """
+        print("\nDetecting sync offset", flush=True)
+
+        front_trim_frames = (num_source_frames * self.start_trim) // 100
+        end_trim_frames = (num_source_frames * self.end_trim) // 100
+        anchors = np.linspace(
+            front_trim_frames,
+            num_source_frames - end_trim_frames - 1,
+            anchor_count + 2,
+            dtype=int,
+        )[1:-1].tolist()
+
+        try:
+            sync_result = run_async(
+                detect_offset(
+                    self.core,
+                    self.source_node,
+                    self.encode_node,
+                    anchors,
+                    max_offset=self.auto_sync_range,
+                    in_flight=self.governor.max_in_flight(
+                        self.source_node, self.encode_node
+                    ),
+                )
+            )
+        except ValueError as sync_error:
+            print(f"Sync detection skipped: {sync_error}", flush=True)
+            return
+
+        anchor_offsets = ", ".join(str(offset) for offset in sync_result.anchor_offsets)
+        if sync_result.confidence < 0.5:
+            print(
+                f"Sync detection is ambiguous (anchor offsets: {anchor_offsets}), "
+                f"keeping {'--re-sync ' + self.re_sync if self.re_sync else 'no offset'}",
+                flush=True,
             )
+            return
+
+        self.re_sync = str(sync_result.offset) if sync_result.offset else None
+        print(
+            f"Detected sync offset: {sync_result.offset} frame(s) "
+            f"({sync_result.confidence:.0%} of anchors agree)",
+            flush=True,
+        )
 
     def generate_exact_screens(
         self,
@@ -277,30 +676,28 @@ class GenerateImages:
     ) -> Path:
         print("\nGenerating screenshots, please wait", flush=True)
 
-        # generate source images
-        ScreenGen(
-            vs_source_info,
-            frame_numbers=[
-                int(self.frames[i]) for i in range(len(self.frames)) if i % 2 == 0
-            ],
-            fpng_compression=self.fpng_compression,
-            folder=screenshot_comparison_dir,
-            suffix="a_source__%d",
-            callback=self.screen_gen_callback,
-            encoder=self.img_lib,
-        )
+        source_frames = [
+            int(self.frames[i]) for i in range(len(self.frames)) if i % 2 == 0
+        ]
+        encode_frames = [
+            int(self.frames[i]) for i in range(len(self.frames)) if i % 2 != 0
+        ]
 
-        # generate encode images
-        ScreenGen(
-            vs_encode_info,
-            frame_numbers=[
-                int(self.frames[i]) for i in range(len(self.frames)) if i % 2 != 0
-            ],
-            fpng_compression=self.fpng_compression,
-            folder=screenshot_comparison_dir,
-            suffix="b_encode__%d",
-            callback=self.screen_gen_callback,
-            encoder=self.img_lib,
+        # generate source and encode images together
+        self.render_engine.render_sequences(
+            self.plan_sequences(
+                *self.attach_metrics(
+                    *self.comparison_jobs(
+                        vs_source_info,
+                        vs_encode_info,
+                        source_frames,
+                        encode_frames,
+                        screenshot_comparison_dir,
+                        self.thumbnail_folder(screenshot_comparison_dir),
+                        self.thumbnail_format,
+                    )
+                )
+            )
         )
 
         print("Screen generation completed", flush=True)
@@ -320,7 +717,9 @@ class GenerateImages:
 
         # handle re_sync if needed
         sync_frames = []
-        if self.re_sync:
+        if self.drift_map:
+            sync_frames = [self.mapped_source_frame(frame) for frame in b_frames]
+        elif self.re_sync:
             get_sync_digits = re.search(r"(\d+)", self.re_sync)
             sync_digits = int(get_sync_digits.group(1)) if get_sync_digits else 0
             for x_frames in b_frames:
@@ -331,26 +730,21 @@ class GenerateImages:
         else:
             sync_frames = b_frames
 
-        # generate source images
-        ScreenGen(
-            vs_source_info,
-            frame_numbers=sync_frames,
-            fpng_compression=self.fpng_compression,
-            folder=screenshot_comparison_dir,
-            suffix="a_source__%d",
-            callback=self.screen_gen_callback,
-            encoder=self.img_lib,
-        )
-
-        # generate encode images
-        ScreenGen(
-            vs_encode_info,
-            frame_numbers=b_frames,
-            fpng_compression=self.fpng_compression,
-            folder=screenshot_comparison_dir,
-            suffix="b_encode__%d",
-            callback=self.screen_gen_callback,
-            encoder=self.img_lib,
+        # generate source and encode images together
+        self.render_engine.render_sequences(
+            self.plan_sequences(
+                *self.attach_metrics(
+                    *self.comparison_jobs(
+                        vs_source_info,
+                        vs_encode_info,
+                        sync_frames,
+                        b_frames,
+                        screenshot_comparison_dir,
+                        self.thumbnail_folder(screenshot_comparison_dir),
+                        self.thumbnail_format,
+                    )
+                )
+            )
         )
 
         # generate some sync frames
@@ -366,31 +760,106 @@ class GenerateImages:
         ref_sync_list = sorted([get_sync_1, get_sync_2])
 
         # reference subs
-        self.generate_ref_screens(
+        ref_jobs = self.generate_ref_screens(
             selected_sub_style_ref, ref_sync_list, screenshot_sync_dir
         )
 
-        # sync subs 1
-        sync_subs_1 = [ref_sync_list[0] + i for i in range(-5, 6)]
-
-        self.generate_sync_screens(
-            sync_subs_1,
+        # sync subs 1 and 2, both windows share a single overlay node and are planned
+        # together so each window is decoded in one forward pass
+        sync_centers = ref_sync_list
+        if self.drift_map:
+            sync_centers = [self.mapped_source_frame(frame) for frame in ref_sync_list]
+        sync_subs_1 = [sync_centers[0] + i for i in range(-5, 6)]
+        sync_subs_2 = [sync_centers[1] + i for i in range(-5, 6)]
+        sync_jobs = self.generate_sync_screens(
+            (
+                (sync_subs_1, Path(Path(screenshot_sync_dir) / "sync1")),
+                (sync_subs_2, Path(Path(screenshot_sync_dir) / "sync2")),
+            ),
             selected_sub_style_sync,
-            Path(Path(screenshot_sync_dir) / "sync1"),
         )
 
-        # sync subs 2
-        sync_subs_2 = [ref_sync_list[1] + i for i in range(-5, 6)]
-
-        self.generate_sync_screens(
-            sync_subs_2,
-            selected_sub_style_sync,
-            Path(Path(screenshot_sync_dir) / "sync2"),
-        )
+        # one sequence per clip, the source and encode clips are rendered concurrently
+        self.render_engine.render_sequences(self.plan_sequences(sync_jobs, ref_jobs))
 
         print("Screen generation completed", flush=True)
         return screenshot_comparison_dir
 
+    @staticmethod
+    def comparison_jobs(
+        vs_source_info,
+        vs_encode_info,
+        source_frames: list[int],
+        encode_frames: list[int],
+        screenshot_comparison_dir: Path,
+        thumbnail_dir: Path | None = None,
+        thumbnail_format: str = "png",
+    ) -> tuple[list[RenderJob], list[RenderJob]]:
+        """
+        Builds the source and encode render jobs, file names match what ScreenGen
+        produced (i.e. 01a_source__1000.png). Thumbnails (if a folder is given) share
+        the image's name with the thumbnail format's extension.
+        """
+
+        def job(clip, frame: int, name: str) -> RenderJob:
+            return RenderJob(
+                clip,
+                frame,
+                screenshot_comparison_dir / f"{name}.png",
+                thumbnail_dir / f"{name}.{thumbnail_format}" if thumbnail_dir else None,
+            )
+
+        source_jobs = [
+            job(vs_source_info, frame, f"{idx:02d}a_source__{frame}")
+            for idx, frame in enumerate(source_frames, start=1)
+        ]
+        encode_jobs = [
+            job(vs_encode_info, frame, f"{idx:02d}b_encode__{frame}")
+            for idx, frame in enumerate(encode_frames, start=1)
+        ]
+        return source_jobs, encode_jobs
+
+    def attach_metrics(
+        self, source_jobs: list[RenderJob], encode_jobs: list[RenderJob]
+    ) -> tuple[list[RenderJob], list[RenderJob]]:
+        """
+        Captures the luma of each comparison frame before the overlays are applied (from
+        the same decode as the image) so PSNR/SSIM/MAE are computed while rendering
+        """
+        if not self.metrics:
+            return source_jobs, encode_jobs
+
+        source_capture = metrics_node(self.core, self.source_node)  # pyright: ignore [reportArgumentType]
+        encode_capture = metrics_node(self.core, self.encode_node)  # pyright: ignore [reportArgumentType]
+        source_jobs = [job._replace(capture_clip=source_capture) for job in source_jobs]
+        encode_jobs = [job._replace(capture_clip=encode_capture) for job in encode_jobs]
+
+        self.metrics_collector = MetricsCollector(source_jobs, encode_jobs)
+        self.render_engine.capture_callback = self.metrics_collector.add
+        return source_jobs, encode_jobs
+
+    def thumbnail_folder(self, screenshot_comparison_dir: Path) -> Path | None:
+        """Thumbnails are staged in their own folder next to img_comparison"""
+        if not self.thumbnail_width:
+            return None
+        return screenshot_comparison_dir.parent / "img_thumbnails"
+
+    def plan_sequences(
+        self, source_jobs: list[RenderJob], encode_jobs: list[RenderJob]
+    ) -> list[list[RenderJob | DecodeJob]]:
+        """
+        Orders the source and encode jobs by decode position (one sequence per decoder),
+        short gaps between requested frames are decoded through instead of seeking
+        """
+        return [
+            FrameAccessPlanner(self.source_keyframes).sequence(
+                source_jobs, self.source_decode_node
+            ),
+            FrameAccessPlanner(self.encode_keyframes).sequence(
+                encode_jobs, self.encode_decode_node
+            ),
+        ]
+
     def handle_subtitles(self, selected_sub_style):
         vs_source_info = self.core.sub.Subtitle(
             clip=self.source_node, text=self.source_sub_title, style=selected_sub_style
@@ -476,21 +945,18 @@ class GenerateImages:
                 Path(self.encode_file).parent / f"{Path(self.encode_file).stem}_images"
             )
 
-        if image_output_dir.exists():
-            for folder in ("img_comparison", "img_selected", "img_sync"):
-                rm_path = image_output_dir / folder
-                if rm_path.is_dir() and rm_path.exists():
-                    shutil.rmtree(rm_path, ignore_errors=True)
-
+        # previous results are only replaced once the new images are ready (see move_images)
         image_output_dir.mkdir(exist_ok=True, parents=True)
 
         print("Folder creation completed", flush=True)
 
         return image_output_dir
 
-    def generate_temp_folders(self) -> Tuple[Path, Path, Path]:
-        print("\nCreating temporary folders for images", flush=True)
-        self.temp_dir = Path(tempfile.mkdtemp(prefix="ff_"))
+    def generate_temp_folders(self, output_folder: Path) -> Tuple[Path, Path, Path]:
+        print("\nCreating staging folders for images", flush=True)
+        # stage inside the output folder so the images can be swapped in with renames
+        # (same filesystem) instead of being copied
+        self.temp_dir = Path(tempfile.mkdtemp(prefix=".ff_", dir=output_folder))
 
         screenshot_comparison_dir = Path(Path(self.temp_dir) / "img_comparison")
         screenshot_comparison_dir.mkdir(exist_ok=True)
@@ -509,54 +975,85 @@ class GenerateImages:
         return screenshot_comparison_dir, selected_dir, screenshot_sync_dir
 
     def move_images(self, temp_folder: Path, output_folder: Path) -> None:
+        """
+        Swaps the staged image folders into the output folder with renames. All previous
+        results (image folders and reports, even ones this run doesn't produce) are moved
+        aside into the staging folder (removed by clean_temp)
+        """
         print("\nMoving generated images", flush=True)
 
-        for sub_folder in temp_folder.iterdir():
-            if sub_folder.is_dir():
-                target_sub_folder = output_folder / sub_folder.name
-                target_sub_folder.mkdir(parents=True, exist_ok=True)
-
-                for item in sub_folder.iterdir():
-                    target_item = target_sub_folder / item.name
-
-                    # retry for 50 seconds (10 attempts, 5s each)
-                    attempts = 10
-                    while attempts > 0:
-                        try:
-                            if item.is_dir():
-                                shutil.move(item, target_item)
-                            else:
-                                shutil.move(item, target_sub_folder)
-                            # exit loop if successful
-                            break
-                        except PermissionError:
-                            attempts -= 1
-                            if attempts == 0:
-                                print(
-                                    f"Failed to move {item} due to permission issues after multiple attempts",
-                                    flush=True,
-                                )
-                                raise PermissionError(
-                                    f"Failed to move {item} due to permission issues"
-                                ) from None
-                            else:
-                                print(
-                                    f"Permission denied for {item}, retrying in 5 seconds "
-                                    f"(close any open files/folders/terminals related to the "
-                                    f"image output path '{target_sub_folder}')...",
-                                    flush=True,
-                                )
-                                sleep(5)
+        staged_folders = [item for item in temp_folder.iterdir() if item.is_dir()]
+        replaced_folder = temp_folder / ".replaced"
+        replaced_folder.mkdir(exist_ok=True)
+
+        previous_results = {output_folder / name for name in OUTPUT_FOLDERS}
+        previous_results.update(output_folder / item.name for item in staged_folders)
+        for pattern in OUTPUT_FILE_PATTERNS:
+            previous_results.update(output_folder.glob(pattern))
+        for previous in previous_results:
+            if previous.exists():
+                self._rename_with_retry(previous, replaced_folder / previous.name)
+
+        for sub_folder in staged_folders:
+            self._rename_with_retry(sub_folder, output_folder / sub_folder.name)
 
         print("Image move completed", flush=True)
 
+    @staticmethod
+    def _rename_with_retry(item: Path, target: Path, attempts: int = 8) -> None:
+        """Renames with a short exponential backoff (~30s total) on permission errors"""
+        delay = 0.25
+        for attempt in range(1, attempts + 1):
+            try:
+                item.rename(target)
+                return
+            except PermissionError:
+                if attempt == attempts:
+                    print(
+                        f"Failed to move {item} due to permission issues after multiple attempts",
+                        flush=True,
+                    )
+                    raise PermissionError(
+                        f"Failed to move {item} due to permission issues"
+                    ) from None
+                print(
+                    f"Permission denied for {item}, retrying in {delay:g} seconds "
+                    f"(close any open files/folders/terminals related to the "
+                    f"image output path '{target.parent}')...",
+                    flush=True,
+                )
+                sleep(delay)
+                delay *= 2
+
+    def finish_optimization(self) -> None:
+        """Waits for the background PNG optimization of the rendered images"""
+        optimizer = self.render_engine.optimizer
+        if not optimizer:
+            return
+
+        print("\nFinishing PNG optimization", flush=True)
+        results = optimizer.finish()
+        original_size = sum(result.original_size for result in results)
+        optimized_size = sum(result.optimized_size for result in results)
+        saved = original_size - optimized_size
+        print(
+            f"PNG optimization completed, saved {saved / 1024**2:.2f} MiB "
+            f"({saved / max(1, original_size):.1%}) over {len(results)} images",
+            flush=True,
+        )
+
     def clean_temp(self, status: bool = True) -> None:
+        if self.render_engine.optimizer:
+            self.render_engine.optimizer.close()
         if self.temp_dir:
             if status:
                 print("\nRemoving temp folder")
             shutil.rmtree(self.temp_dir, ignore_errors=True)
             if status:
                 print("Temp folder removal completed")
+        if self.index_temp_dir:
+            shutil.rmtree(self.index_temp_dir, ignore_errors=True)
+            self.index_temp_dir = None
 
     async def get_b_frames(
         self, num_source_frames: int, start_trim: int, end_trim: int
@@ -590,45 +1087,47 @@ class GenerateImages:
 
         pict_types = {"B", b"B"}
 
-        # limit to 5 concurrent frame fetches
-        semaphore = asyncio.Semaphore(5)
+        if self.encode_pict_types is not None:
+            print("Using picture types from the encode index", flush=True)
+
+        # keep a sliding window of frame requests in flight (sized by the resource
+        # governor), a free slot immediately picks up the next request
+        window = self.governor.max_in_flight(self.encode_node)
+
+        if self.frame_selection == "scene":
+            # move each interval point to the most detailed frame in the first half of
+            # its interval, away from scene changes, fades and black frames
+            print("Scoring candidate frames for scene changes and detail", flush=True)
+            frame_scorer = FrameScorer(self.core, self.encode_node, window)
+            b_frames = await frame_scorer.best_frames(b_frames, max(1, interval // 2))
+        elif self.frame_selection == "diverse":
+            # one frame per cluster of similar looking frames instead of even spacing
+            print("Sampling frames for diverse content", flush=True)
+            b_frames = await select_diverse_frames(
+                self.core,
+                self.encode_node,
+                front_trim_frames,
+                min(num_source_frames, len(self.encode_node)) - end_trim_frames - 1,
+                self.comparison_count,
+                in_flight=window,
+            )
+            # stay close to the representative while looking for a 'B' frame
+            interval = min(interval, 48)
 
-        async def check_frame(frame: int, max_attempts: int = 5):
-            """Fetch frame asynchronously while respecting the semaphore limit."""
-            async with semaphore:
-                attempts = 0
-                while frame < num_source_frames and attempts < max_attempts:
-                    future = self.encode_node.get_frame_async(frame)  # pyright: ignore [reportOptionalMemberAccess]
-                    video_frame = await asyncio.wrap_future(future)
+        async def probe_frames(frames) -> list:
+            semaphore = asyncio.Semaphore(window)
 
-                    if video_frame.props["_PictType"] in pict_types:
-                        return frame
-                    frame += 1
-                    attempts += 1
-                return None
+            async def probe(frame: int):
+                async with semaphore:
+                    return await self.get_pict_type(frame)
+
+            return await asyncio.gather(*[probe(int(frame)) for frame in frames])
 
         # sample a few frames across the video to check if B-frames exist
         sampled_frames = np.linspace(
             0, num_source_frames - 1, min(10, num_source_frames), dtype=int
         )
-
-        # fetch sample frames in batches
-        async def fetch_sampled_frames():
-            results = []
-            # process in chunks of 5
-            for i in range(0, len(sampled_frames), 5):
-                batch = sampled_frames[i : i + 5]
-                sample_futures = [
-                    asyncio.wrap_future(self.encode_node.get_frame_async(int(frame)))  # pyright: ignore [reportOptionalMemberAccess]
-                    for frame in batch
-                ]
-                results.extend(await asyncio.gather(*sample_futures))
-            return results
-
-        sampled_video_frames = await fetch_sampled_frames()
-        sampled_pict_types = {
-            frame.props["_PictType"] for frame in sampled_video_frames
-        }
+        sampled_pict_types = set(await probe_frames(sampled_frames))
 
         # if no B-frames exist, fall back early
         if not pict_types.intersection(sampled_pict_types):
@@ -638,19 +1137,50 @@ class GenerateImages:
             )
             pict_types = {"I", b"I", "P", b"P", "B", b"B"}
 
-        # process frame checks in batches to avoid overloading VapourSynth
-        async def process_frames_in_batches(frames, batch_size=5):
-            results = []
-            for i in range(0, len(frames), batch_size):
-                batch = frames[i : i + batch_size]
-                batch_results = await asyncio.gather(
-                    *[check_frame(int(frame)) for frame in batch]
-                )
-                results.extend(batch_results)
-            return results
+        max_attempts = 5
+        max_alternatives = 2
+
+        def candidate_starts(start: int) -> list[int]:
+            """The candidate followed by alternatives spread over the rest of its interval"""
+            starts = [start]
+            for step in range(1, max_alternatives + 1):
+                alternative = start + (interval * step) // (max_alternatives + 1)
+                if alternative >= starts[-1] + max_attempts:
+                    starts.append(alternative)
+            return starts
+
+        async def find_frame(start: int) -> int | None:
+            for candidate in candidate_starts(start):
+                for frame in range(
+                    candidate, min(candidate + max_attempts, num_source_frames)
+                ):
+                    if await self.get_pict_type(frame) in pict_types:
+                        return frame
+            return None
+
+        # each candidate stops probing as soon as it finds a frame, workers stream
+        # through the candidates instead of waiting on the slowest frame of a batch
+        found_frames: list[int | None] = [None] * len(b_frames)
+        pending_candidates = iter(enumerate(b_frames))
+
+        async def search_worker():
+            for idx, start in pending_candidates:
+                found_frames[idx] = await find_frame(int(start))
+
+        await asyncio.gather(
+            *[search_worker() for _ in range(min(window, len(b_frames)))]
+        )
+
+        if self.filter_frames:
+            found_frames = await self.filter_candidates(
+                found_frames, b_frames, interval, find_frame, window
+            )
+        valid_b_frames = list(
+            dict.fromkeys(frame for frame in found_frames if frame is not None)
+        )
 
-        valid_b_frames = await process_frames_in_batches(b_frames)
-        valid_b_frames = [frame for frame in valid_b_frames if frame is not None]
+        if self.encode_frame_type_cache:
+            self.encode_frame_type_cache.save()
 
         if not valid_b_frames:
             raise FrameForgeError(
@@ -660,6 +1190,138 @@ class GenerateImages:
         print(f"Finished generating {len(valid_b_frames)} 'B' frames", flush=True)
         return valid_b_frames
 
+    async def filter_candidates(
+        self,
+        found_frames: list[int | None],
+        starts: list[int],
+        interval: int,
+        find_frame,
+        window: int,
+    ) -> list[int | None]:
+        """
+        Rejects black, flat and near-duplicate frames, a rejected frame is replaced by
+        searching further into its own interval.
+
+        Args:
+            found_frames (list[int | None]): Found frame per interval (None if not found)
+            starts (list[int]): Start frame of each interval
+            interval (int): Interval length
+            find_frame: Coroutine function searching a usable frame from a start frame
+            window (int): Number of frames requested at once
+
+        Returns:
+            (list[int | None]): Accepted frame per interval (None if none qualified)
+        """
+        candidate_filter = CandidateFilter(self.core, self.encode_node, window)  # pyright: ignore [reportArgumentType]
+
+        async def check(frame: int | None) -> np.ndarray | None:
+            return None if frame is None else await candidate_filter.fingerprint(frame)
+
+        # the content checks of all candidates are batched, duplicates are decided in
+        # order afterwards
+        fingerprints = await asyncio.gather(*[check(frame) for frame in found_frames])
+
+        replacement_count = 3
+        accepted: list[np.ndarray] = []
+        filtered_frames: list[int | None] = []
+        rejected = replaced = 0
+        for frame, fingerprint, start in zip(found_frames, fingerprints, starts):
+            if frame is not None and (
+                fingerprint is None
+                or candidate_filter.is_duplicate(fingerprint, accepted)
+            ):
+                rejected += 1
+                tried = {frame}
+                frame = None
+                for step in range(1, replacement_count + 1):
+                    replacement = await find_frame(
+                        int(start) + (interval * step) // (replacement_count + 1)
+                    )
+                    if replacement is None or replacement in tried:
+                        continue
+                    tried.add(replacement)
+                    fingerprint = await candidate_filter.fingerprint(replacement)
+                    if fingerprint is not None and not candidate_filter.is_duplicate(
+                        fingerprint, accepted
+                    ):
+                        frame = replacement
+                        replaced += 1
+                        break
+
+            if frame is not None and fingerprint is not None:
+                accepted.append(fingerprint)
+            filtered_frames.append(frame)
+
+        if rejected:
+            print(
+                f"Rejected {rejected} black, flat or duplicate frame(s), "
+                f"{replaced} replaced",
+                flush=True,
+            )
+        return filtered_frames
+
+    async def get_pict_type(self, frame: int) -> str | bytes:
+        """Returns the encode frame's picture type, from the index/cache when possible"""
+        if self.encode_pict_types is not None:
+            return self.encode_pict_types[frame : frame + 1]
+
+        # the cache is keyed by the encode file's frames, not the (SelectEvery) node's
+        file_frame = frame * self.encode_frame_step
+        if self.encode_frame_type_cache:
+            cached_pict_type = self.encode_frame_type_cache.get(file_frame)
+            if cached_pict_type:
+                return cached_pict_type
+
+        start = time.perf_counter()
+        future = self.encode_node.get_frame_async(frame)  # pyright: ignore [reportOptionalMemberAccess]
+        video_frame = await asyncio.wrap_future(future)
+        self.profiler.record_latency("decode", time.perf_counter() - start)
+        pict_type = video_frame.props["_PictType"]
+
+        if self.encode_frame_type_cache:
+            self.encode_frame_type_cache.set(file_frame, pict_type)  # pyright: ignore [reportArgumentType]
+
+        return pict_type  # pyright: ignore [reportReturnType]
+
+    def load_encode_pict_types(self, index_path: Path | str | None) -> None:
+        """
+        Loads the encode picture types and keyframes from its index, only if they line up
+        with the node. Otherwise picture types fall back to the frame type cache sidecar (filled as frames are probed).
+        """
+        self.encode_pict_types = None
+        self.encode_keyframes = None
+        self.encode_frame_type_cache = None
+        if not self.encode_node:
+            return
+
+        index_info = read_index_info(index_path)
+        if index_info and len(index_info.pict_types) == len(self.encode_node):
+            self.encode_pict_types = index_info.pict_types
+            self.encode_keyframes = index_info.keyframes
+            return
+
+        cache_path = (
+            Path(index_path).with_suffix(".ffpt")
+            if index_path
+            else Path(self.encode_file).with_suffix(".ffpt")
+        )
+        try:
+            self.encode_frame_type_cache = FrameTypeCache.load(
+                self.encode_file, len(self.encode_node), cache_path
+            )
+        except OSError:
+            self.encode_frame_type_cache = None
+
+    @staticmethod
+    def read_keyframes(
+        index_path: Path | str | None, node: vs.VideoNode | None
+    ) -> np.ndarray | None:
+        """Keyframes of the node from its index, only if the index lines up with it"""
+        index_info = read_index_info(index_path)
+        if index_info and node and len(index_info.pict_types) == len(node):
+            return index_info.keyframes
+        return None
+
     def check_de_interlaced(self, num_source_frames, num_encode_frames):
         print("\nChecking if encode has been de-interlaced", flush=True)
         if not self.source_node or not self.encode_node:
@@ -690,11 +1352,22 @@ class GenerateImages:
                             self.source_node = self.core.std.SelectEvery(
                                 self.source_node, cycle=2, offsets=0
                             )
+                            if self.source_keyframes is not None:
+                                self.source_keyframes = np.unique(
+                                    (self.source_keyframes + 1) // 2
+                                )
                         elif file_differences < 0.99:
                             even_frames_for = "encode"
                             self.encode_node = self.core.std.SelectEvery(
                                 self.encode_node, cycle=2, offsets=0
                             )
+                            self.encode_frame_step = 2
+                            if self.encode_pict_types is not None:
+                                self.encode_pict_types = self.encode_pict_types[::2]
+                            if self.encode_keyframes is not None:
+                                self.encode_keyframes = np.unique(
+                                    (self.encode_keyframes + 1) // 2
+                                )
                         print(
                             f"Source: FPS={source_fps} Frames={num_source_frames}\n"
                             f"Encode: FPS={encode_fps} Frames={num_encode_frames}\n"
@@ -735,20 +1408,21 @@ class GenerateImages:
 
         # if no existing index is found index source file
         elif not lwi_cache_path:
-            lwi_cache_path = Path(Path(self.source_file).with_suffix(".lwi"))
+            lwi_cache_path = Path(self.source_index_path)  # pyright: ignore [reportArgumentType]
 
         try:
             self.source_node = self.core.lsmas.LWLibavSource(
                 source=self.source_file, cachefile=lwi_cache_path
             )
-            self.reference_source_file = self.core.lsmas.LWLibavSource(
-                source=self.source_file, cachefile=lwi_cache_path
-            )
             print("Using existing index", flush=True)
         except vs.Error:
             print("L-Smash version miss-match, indexing source again", flush=True)
             self.source_node = self.core.lsmas.LWLibavSource(self.source_file)
-            self.reference_source_file = self.core.lsmas.LWLibavSource(self.source_file)
+
+        # crop/resize/de-interlace build new nodes, so the reference stays untouched
+        # while sharing the source's decoder and frame cache
+        self.reference_source_file = self.source_node
+        self.source_keyframes = self.read_keyframes(lwi_cache_path, self.source_node)
 
         print("Source index completed", flush=True)
 
@@ -765,18 +1439,23 @@ class GenerateImages:
                 self.encode_file, cachefile=cache_path_enc
             )
         except vs.Error:
-            cache_path_enc.unlink(missing_ok=True)
+            cache_path_enc = self.rebuild_index_path(cache_path_enc, "encode")
             self.encode_node = self.core.lsmas.LWLibavSource(
                 self.encode_file, cachefile=cache_path_enc
             )
 
+        self.load_encode_pict_types(cache_path_enc)
         print("Encode index completed", flush=True)
 
-    def index_lsmash(self):
+    def index_lsmash(self, source: bool = True, encode: bool = True):
         """Index source/encode with lsmash"""
 
-        self._index_source_lsmash()
-        self._index_encode_lsmash()
+        if source and encode:
+            self.build_indexes_in_parallel(".lwi")
+        if source:
+            self._index_source_lsmash()
+        if encode:
+            self._index_encode_lsmash()
 
     def _index_source_ffms2(self):
         print("Indexing source", flush=True)
@@ -803,7 +1482,7 @@ class GenerateImages:
 
         # if no existing index is found index source file
         elif not ffindex_cache_path:
-            ffindex_cache_path = Path(Path(self.source_file).with_suffix(".ffindex"))
+            ffindex_cache_path = Path(self.source_index_path)  # pyright: ignore [reportArgumentType]
             print(
                 "FFMS2 library doesn't allow progress, please wait while the index is completed",
                 flush=True,
@@ -813,11 +1492,8 @@ class GenerateImages:
             self.source_node = self.core.ffms2.Source(
                 self.source_file, cachefile=ffindex_cache_path
             )
-            self.reference_source_file = self.core.ffms2.Source(
-                self.source_file, cachefile=ffindex_cache_path
-            )
         except vs.Error:
-            Path(self.source_file).with_suffix(".ffindex").unlink(missing_ok=True)
+            ffindex_cache_path = self.rebuild_index_path(ffindex_cache_path, "source")
             print(
                 "FFMS2 library doesn't allow progress, please wait while the index is completed",
                 flush=True,
@@ -825,9 +1501,13 @@ class GenerateImages:
             self.source_node = self.core.ffms2.Source(
                 self.source_file, cachefile=ffindex_cache_path
             )
-            self.reference_source_file = self.core.ffms2.Source(
-                self.source_file, cachefile=ffindex_cache_path
-            )
+
+        # crop/resize/de-interlace build new nodes, so the reference stays untouched
+        # while sharing the source's decoder and frame cache
+        self.reference_source_file = self.source_node
+        self.source_keyframes = self.read_keyframes(
+            ffindex_cache_path, self.source_node
+        )
 
         print("Source index completed", flush=True)
 
@@ -844,41 +1524,112 @@ class GenerateImages:
                 self.encode_file, cachefile=cache_path_enc
             )
         except vs.Error:
-            cache_path_enc.unlink(missing_ok=True)
+            cache_path_enc = self.rebuild_index_path(cache_path_enc, "encode")
             self.encode_node = self.core.ffms2.Source(
                 self.encode_file, cachefile=cache_path_enc
             )
 
+        self.load_encode_pict_types(cache_path_enc)
         print("Encode index completed", flush=True)
 
-    def index_ffms2(self):
+    def index_ffms2(self, source: bool = True, encode: bool = True):
         """Index source/encode with ffms2"""
 
-        self._index_source_ffms2()
-        self._index_encode_ffms2()
+        if source and encode:
+            self.build_indexes_in_parallel(".ffindex")
+        if source:
+            self._index_source_ffms2()
+        if encode:
+            self._index_encode_ffms2()
+
+    def build_indexes_in_parallel(self, indexer_ext: str) -> None:
+        """
+        When neither the source nor the encode has an index yet, build both at the same
+        time in worker processes. The regular indexing steps then open the finished caches.
+        """
+        src_file_path = Path(self.source_file)
+        source_caches = [
+            src_file_path.parent / f"{src_file_path.stem}_temp" / f"temp{indexer_ext}",
+            src_file_path.parent / f"{src_file_path.name}_temp" / f"temp{indexer_ext}",
+            src_file_path.with_suffix(indexer_ext),
+        ]
+        source_cache = (
+            Path(self.source_index_path)
+            if self.source_index_path
+            else src_file_path.with_suffix(indexer_ext)
+        )
+        source_caches.append(source_cache)
+        if any(cache.exists() for cache in source_caches):
+            return
+
+        encode_cache = (
+            Path(self.encode_index_path)
+            if self.encode_index_path
+            else Path(self.encode_file).with_suffix(indexer_ext)
+        )
+        if encode_cache.exists():
+            return
+
+        build_indexes(
+            self.indexer,
+            {
+                "source": (src_file_path, source_cache),
+                "encode": (Path(self.encode_file), encode_cache),
+            },
+        )
+
+    def rebuild_index_path(self, index_path: Path | str, role: str) -> Path:
+        """
+        Path to rebuild an index that couldn't be opened at. FrameForge's own indexes
+        (next to the media or in the index cache) are replaced in place, external ones
+        (StaxRip's temp index, a user supplied path) are left alone and the index is
+        built in a temp folder (removed by clean_temp).
+
+        Args:
+            index_path (Path | str): Index that couldn't be opened
+            role (str): 'source' or 'encode', keeps the temp indexes apart
+
+        Returns:
+            (Path): Path to build the new index at
+        """
+        index_path = Path(index_path)
+        if index_path in self.owned_index_paths:
+            index_path.unlink(missing_ok=True)
+            return index_path
+
+        if not self.index_temp_dir:
+            self.index_temp_dir = Path(tempfile.mkdtemp(prefix="ff_index_"))
+        return self.index_temp_dir / f"{role}_{index_path.name}"
 
     def load_plugins(self):
-        plugin_path = get_working_dir() / "img_plugins"
-        if not plugin_path.is_dir() and not plugin_path.exists():
-            raise FrameForgeError("Can not detect plugin directory")
-        else:
-            for plugin in plugin_path.glob("*.dll"):
-                self.core.std.LoadPlugin(Path(plugin).resolve())
+        load_plugins(self.core)
 
     def check_index_paths(self):
         indexer_ext = ".lwi" if self.indexer == "lsmash" else ".ffindex"
         if not self.source_index_path or not Path(self.source_index_path).exists():
             source_path_obj = Path(self.source_file)
-            self.source_index_path = source_path_obj.parent / Path(
-                f"{source_path_obj.stem}{indexer_ext}"
-            )
+            if self.index_cache:
+                self.source_index_path = self.index_cache.index_path(
+                    source_path_obj, indexer_ext
+                )
+            else:
+                self.source_index_path = source_path_obj.parent / Path(
+                    f"{source_path_obj.stem}{indexer_ext}"
+                )
+            self.owned_index_paths.add(self.source_index_path)
         else:
             self.source_index_path = Path(self.source_index_path)
 
         if not self.encode_index_path or not Path(self.encode_index_path).exists():
             encode_path_obj = Path(self.encode_file)
-            self.encode_index_path = encode_path_obj.parent / Path(
-                f"{encode_path_obj.stem}{indexer_ext}"
-            )
+            if self.index_cache:
+                self.encode_index_path = self.index_cache.index_path(
+                    encode_path_obj, indexer_ext
+                )
+            else:
+                self.encode_index_path = encode_path_obj.parent / Path(
+                    f"{encode_path_obj.stem}{indexer_ext}"
+                )
+            self.owned_index_paths.add(self.encode_index_path)
         else:
             self.encode_index_path = Path(self.encode_index_path)
@@ -0,0 +1,94 @@
+from dataclasses import asdict, replace
+from pathlib import Path
+
+import vapoursynth as vs
+
+from frame_forge import GenerateImages
+from frame_forge.config import FrameForgeConfig
+from frame_forge.exceptions import FrameForgeError
+from frame_forge.node_cache import NodeCache
+from frame_forge.progress import ProgressReporter
+from frame_forge.render import GenerationResult
+from frame_forge.utils import load_plugins
+
+
+class FrameForge:
+    """
+    Reusable generator for embedding FrameForge in other programs.
+
+    The VapourSynth core and its plugins are set up once and shared by every run, i.e.
+
+        forge = FrameForge(FrameForgeConfig(output="png", comparison_count=10))
+        result = forge.generate("source.mkv", "encode.mkv")
+        for image in result.images:
+            upload(image.path.name, image.data)
+    """
+
+    def __init__(
+        self,
+        config: FrameForgeConfig | None = None,
+        progress: ProgressReporter | None = None,
+        node_cache_size: int = 0,
+    ):
+        """
+        Args:
+            config (FrameForgeConfig | None): Default options of the runs
+            progress (ProgressReporter | None): Receives the progress events of the runs
+            node_cache_size (int): Number of opened source/encode files kept between
+                runs (0 opens them for every run)
+        """
+        self.config = config or FrameForgeConfig()
+        self.progress = progress
+        self.node_cache = NodeCache(node_cache_size) if node_cache_size else None
+        self.core = vs.core
+        load_plugins(self.core)
+
+    def generate(
+        self,
+        source: Path | str | vs.VideoNode,
+        encode: Path | str | vs.VideoNode,
+        source_index_path: str | None = None,
+        encode_index_path: str | None = None,
+        **options,
+    ) -> Path | GenerationResult:
+        """
+        Runs a comparison between a source and an encode.
+
+        Args:
+            source (Path | str | vs.VideoNode): Source file or clip
+            encode (Path | str | vs.VideoNode): Encode file or clip
+            source_index_path (str | None): Index path of the source file
+            encode_index_path (str | None): Index path of the encode file
+            **options: `FrameForgeConfig` fields overriding the defaults for this run
+
+        Returns:
+            (Path | GenerationResult): The output folder, or the images and reports for
+                in-memory output
+        """
+        config = replace(self.config, **options) if options else self.config
+
+        source_is_clip = isinstance(source, vs.VideoNode)
+        if source_is_clip != isinstance(encode, vs.VideoNode):
+            raise FrameForgeError(
+                "Source and encode must either both be files or both be clips"
+            )
+
+        generator = GenerateImages(
+            source_file=Path("source") if source_is_clip else Path(source),  # pyright: ignore [reportArgumentType]
+            encode_file=Path("encode") if source_is_clip else Path(encode),  # pyright: ignore [reportArgumentType]
+            source_node=source if source_is_clip else None,  # pyright: ignore [reportArgumentType]
+            encode_node=encode if source_is_clip else None,  # pyright: ignore [reportArgumentType]
+            source_index_path=source_index_path,
+            encode_index_path=encode_index_path,
+            progress=self.progress,
+            core=self.core,
+            node_cache=self.node_cache,
+            **asdict(config),
+        )
+        try:
+            return generator.process_images()
+        finally:
+            generator.clean_temp(False)
+            generator.render_engine.close()
+            # the job's threads/memory limit mustn't leak into later runs on the core
+            generator.governor.restore()
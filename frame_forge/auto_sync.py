@@ -0,0 +1,154 @@
+import asyncio
+from typing import NamedTuple
+
+import numpy as np
+import vapoursynth as vs
+
+# fingerprints are tiny float luma frames, enough to tell frames apart but cheap to
+# compare (the downscale also hides crop/resize/encoding differences)
+FINGERPRINT_WIDTH = 64
+FINGERPRINT_HEIGHT = 36
+
+
+class SyncResult(NamedTuple):
+    """Detected offset, `source frame = encode frame + offset`"""
+
+    offset: int
+    # share of the anchors that agree with the offset (0 - 1)
+    confidence: float
+    # best offset of each anchor on its own
+    anchor_offsets: list[int]
+
+
+def fingerprint_node(core: vs.Core, clip: vs.VideoNode) -> vs.VideoNode:
+    """Heavily downscales the clip to float luma"""
+    matrix = {"matrix_s": "709"} if clip.format.color_family == vs.RGB else {}
+    return core.resize.Bilinear(
+        clip,
+        width=FINGERPRINT_WIDTH,
+        height=FINGERPRINT_HEIGHT,
+        format=vs.GRAYS,
+        **matrix,
+    )
+
+
+async def read_fingerprints(
+    fingerprint_clip: vs.VideoNode, frames: range, window: int
+) -> np.ndarray:
+    """
+    Requests the fingerprints of a range of frames concurrently.
+
+    Returns:
+        (np.ndarray): (frames, pixels) float32 array
+    """
+    semaphore = asyncio.Semaphore(max(1, window))
+
+    async def read(frame: int) -> np.ndarray:
+        async with semaphore:
+            fingerprint = await asyncio.wrap_future(
+                fingerprint_clip.get_frame_async(frame)
+            )
+            return np.array(fingerprint[0], dtype=np.float32).ravel()
+
+    return np.stack(await asyncio.gather(*[read(frame) for frame in frames]))
+
+
+def _normalize(rows: np.ndarray) -> np.ndarray:
+    """Zero mean, unit length rows (flat rows stay zero)"""
+    rows = rows - rows.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(rows, axis=1, keepdims=True)
+    return np.divide(rows, norms, out=np.zeros_like(rows), where=norms > 1e-6)
+
+
+def offset_scores(
+    encode_prints: np.ndarray, source_prints: np.ndarray, max_offset: int
+) -> np.ndarray:
+    """
+    Scores every offset in `-max_offset..max_offset` by the mean correlation of the
+    encode frames with the source frames shifted by the offset. Both the frames and their
+    temporal differences are correlated, the differences keep static shots from matching
+    at any offset.
+
+    Args:
+        encode_prints (np.ndarray): (length, pixels) encode fingerprints
+        source_prints (np.ndarray): (length + 2 * max_offset, pixels) source fingerprints,
+            starting `max_offset` frames before the encode window
+        max_offset (int): Largest offset searched in either direction
+
+    Returns:
+        (np.ndarray): One score per offset (index 0 is `-max_offset`)
+    """
+    length = len(encode_prints)
+    rows = np.arange(length)[:, np.newaxis]
+    shifts = np.arange(2 * max_offset + 1)[np.newaxis, :]
+
+    intensity = _normalize(encode_prints) @ _normalize(source_prints).T
+    motion = (
+        _normalize(np.diff(encode_prints, axis=0))
+        @ _normalize(np.diff(source_prints, axis=0)).T
+    )
+
+    # diagonal i -> i + shift of each correlation matrix
+    intensity_scores = intensity[rows, rows + shifts].mean(axis=0)
+    motion_scores = motion[rows[:-1], rows[:-1] + shifts].mean(axis=0)
+    return intensity_scores + motion_scores
+
+
+async def detect_offset(
+    core: vs.Core,
+    source_clip: vs.VideoNode,
+    encode_clip: vs.VideoNode,
+    anchors: list[int],
+    max_offset: int = 30,
+    window_length: int = 48,
+    in_flight: int = 8,
+) -> SyncResult:
+    """
+    Finds the global frame offset between the source and encode by correlating
+    fingerprints of short windows around a few anchor points.
+
+    Args:
+        core (vs.Core): VapourSynth core
+        source_clip (vs.VideoNode): Source clip (cropped/resized like the encode)
+        encode_clip (vs.VideoNode): Encode clip
+        anchors (list[int]): Encode frames the windows start at (moved inside the clips
+            if needed)
+        max_offset (int): Largest offset searched in either direction
+        window_length (int): Number of encode frames compared per anchor
+        in_flight (int): Number of fingerprint requests kept in flight
+
+    Returns:
+        (SyncResult): The offset with the highest combined score
+    """
+    source_prints_clip = fingerprint_node(core, source_clip)
+    encode_prints_clip = fingerprint_node(core, encode_clip)
+
+    last_start = min(
+        len(encode_clip) - window_length,
+        len(source_clip) - window_length - max_offset,
+    )
+    if last_start < max_offset:
+        raise ValueError("Clips are too short to detect a sync offset")
+
+    starts = sorted({min(max(anchor, max_offset), last_start) for anchor in anchors})
+
+    combined = np.zeros(2 * max_offset + 1, dtype=np.float64)
+    anchor_offsets = []
+    for start in starts:
+        encode_prints, source_prints = await asyncio.gather(
+            read_fingerprints(
+                encode_prints_clip, range(start, start + window_length), in_flight
+            ),
+            read_fingerprints(
+                source_prints_clip,
+                range(start - max_offset, start + window_length + max_offset),
+                in_flight,
+            ),
+        )
+        scores = offset_scores(encode_prints, source_prints, max_offset)
+        combined += scores
+        anchor_offsets.append(int(scores.argmax()) - max_offset)
+
+    offset = int(combined.argmax()) - max_offset
+    confidence = anchor_offsets.count(offset) / len(anchor_offsets)
+    return SyncResult(offset, confidence, anchor_offsets)
@@ -0,0 +1,88 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass
+class FrameForgeConfig:
+    """
+    Options of an image generation run (the CLI's options and defaults), everything
+    except the inputs which are given per run (see `FrameForge.generate`).
+
+    `output` keeps the images in memory as PNG bytes ('png') or RGB arrays ('array')
+    instead of writing them to `image_dir` ('files').
+    """
+
+    output: str = "files"
+    image_dir: Path | None = None
+    frames: list[int] | None = None
+    comparison_count: int = 20
+    start_trim: int = 12
+    end_trim: int = 12
+
+    # indexing
+    indexer: str = "lsmash"
+    index_cache_dir: str | None = None
+    index_cache_size: float = 10
+
+    # resources
+    memory_limit: int | None = None
+    threads: int | None = None
+
+    # image encoding
+    img_lib: str = "fpng"
+    fpng_compression: int = 1
+    png_compression: int = 6
+    png_filter: str = "adaptive"
+    png_strategy: str = "default"
+    optimize_png: bool = False
+    optimize_workers: int | None = None
+    thumbnail_width: int | None = None
+    thumbnail_format: str = "png"
+
+    # crop, resize and tone mapping
+    left_crop: int | None = None
+    right_crop: int | None = None
+    top_crop: int | None = None
+    bottom_crop: int | None = None
+    adv_resize_left: float | None = None
+    adv_resize_right: float | None = None
+    adv_resize_top: float | None = None
+    adv_resize_bottom: float | None = None
+    tone_map: bool = False
+
+    # sync and frame selection
+    re_sync: str | None = None
+    auto_sync: bool = False
+    auto_sync_range: int = 30
+    drift_map: bool = False
+    frame_selection: str = "interval"
+    filter_frames: bool = False
+
+    # reports
+    metrics: bool = False
+    profile: bool = False
+    profile_cprofile: bool = False
+
+    # subtitles
+    sub_size: int = 20
+    sub_alignment: int = 7
+    sub_color: str | None = None
+    sub_secondary_color: str | None = None
+    sub_outline_color: str | None = None
+    sub_back_color: str | None = None
+    sub_font_name: str = "Segoe UI"
+    sub_bold: int = 1
+    sub_italic: int = 0
+    sub_underline: int = 0
+    sub_strikeout: int = 0
+    sub_scale_x: int = 100
+    sub_scale_y: int = 100
+    sub_spacing: int = 0
+    sub_border_style: int = 0
+    sub_outline_width: int = 1
+    sub_shadow_depth: int = 0
+    sub_left_margin: int = 10
+    sub_right_margin: int = 10
+    sub_vertical_margin: int = 10
+    source_sub_title: str = "Source"
+    release_sub_title: str = "Encode"
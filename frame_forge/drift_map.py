@@ -0,0 +1,224 @@
+import asyncio
+import json
+import os
+from bisect import bisect_right
+from itertools import pairwise
+from pathlib import Path
+
+import numpy as np
+import vapoursynth as vs
+
+from frame_forge.auto_sync import fingerprint_node, offset_scores, read_fingerprints
+
+
+class DriftMap:
+    """
+    Piecewise encode -> source frame map.
+
+    Each segment starts at an encode frame and applies a constant offset until the next
+    segment (`source frame = encode frame + offset`).
+    """
+
+    VERSION = 1
+
+    def __init__(self, segments: list[tuple[int, int]]):
+        """
+        Args:
+            segments (list[tuple[int, int]]): (encode start frame, offset) pairs
+        """
+        segments = sorted(segments)
+        # merge neighbours with the same offset
+        self.segments: list[tuple[int, int]] = []
+        for start, offset in segments:
+            if not self.segments or self.segments[-1][1] != offset:
+                self.segments.append((start, offset))
+        self._starts = [start for start, _ in self.segments]
+
+    def offset(self, encode_frame: int) -> int:
+        idx = bisect_right(self._starts, encode_frame) - 1
+        return self.segments[max(0, idx)][1] if self.segments else 0
+
+    def source_frame(self, encode_frame: int) -> int:
+        """Maps an encode frame to the matching source frame"""
+        return encode_frame + self.offset(encode_frame)
+
+    def __str__(self) -> str:
+        return ", ".join(f"{start}: {offset:+d}" for start, offset in self.segments)
+
+    @classmethod
+    def load(cls, path: Path, key: dict) -> "DriftMap | None":
+        """Loads a cached map, None if it's missing or was built for other files"""
+        try:
+            data = json.loads(Path(path).read_text())
+            if data.get("version") != cls.VERSION or data.get("key") != key:
+                return None
+            return cls(
+                [(int(start), int(offset)) for start, offset in data["segments"]]
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path: Path, key: dict) -> None:
+        """Atomically writes the map, failures are ignored (it's only a cache)"""
+        path = Path(path)
+        temp_path = path.with_name(f"{path.name}.tmp")
+        try:
+            temp_path.write_text(
+                json.dumps(
+                    {"version": self.VERSION, "key": key, "segments": self.segments}
+                )
+            )
+            os.replace(temp_path, path)
+        except OSError:
+            temp_path.unlink(missing_ok=True)
+
+
+class DriftMapper:
+    """
+    Builds a DriftMap from sparse anchors.
+
+    The expected source position of each anchor comes from its `_AbsoluteTime` frame
+    prop (falling back to the previous anchor's offset for VFR sources), fingerprint
+    matching then finds the exact offset around it. Where neighbouring anchors disagree
+    the change point is narrowed down with a binary search.
+    """
+
+    WINDOW_LENGTH = 32
+    REFINE_LENGTH = 8
+
+    def __init__(
+        self,
+        core: vs.Core,
+        source_clip: vs.VideoNode,
+        encode_clip: vs.VideoNode,
+        max_offset: int = 30,
+        in_flight: int = 8,
+    ):
+        self.source_clip = source_clip
+        self.encode_clip = encode_clip
+        self.max_offset = max_offset
+        self.in_flight = in_flight
+        self.source_prints_clip = fingerprint_node(core, source_clip)
+        self.encode_prints_clip = fingerprint_node(core, encode_clip)
+
+        self.source_fps = (
+            float(source_clip.fps) if source_clip.fps.numerator > 0 else None
+        )
+
+    async def _encode_prints(self, start: int, length: int) -> np.ndarray:
+        return await read_fingerprints(
+            self.encode_prints_clip, range(start, start + length), self.in_flight
+        )
+
+    async def _source_prints(self, start: int, length: int) -> np.ndarray | None:
+        if start < 0 or start + length > len(self.source_clip):
+            return None
+        return await read_fingerprints(
+            self.source_prints_clip, range(start, start + length), self.in_flight
+        )
+
+    async def _timestamp_offset(self, encode_frame: int) -> int | None:
+        """Offset suggested by the encode frame's timestamp"""
+        if not self.source_fps:
+            return None
+        encode_frame_props = await asyncio.wrap_future(
+            self.encode_prints_clip.get_frame_async(encode_frame)
+        )
+        timestamp = encode_frame_props.props.get("_AbsoluteTime")
+        if timestamp is None:
+            return None
+        return round(float(timestamp) * self.source_fps) - encode_frame
+
+    async def _anchor_offset(
+        self, encode_frame: int, guesses: list[int]
+    ) -> tuple[int, float] | None:
+        """Best (offset, score) searched around each guessed offset"""
+        encode_prints = await self._encode_prints(encode_frame, self.WINDOW_LENGTH)
+        best = None
+        for guess in dict.fromkeys(guesses):
+            # clamp the search so it stays inside the source
+            search = min(
+                self.max_offset,
+                encode_frame + guess,
+                len(self.source_clip) - (encode_frame + guess + self.WINDOW_LENGTH),
+            )
+            if search < 0:
+                continue
+            source_prints = await self._source_prints(
+                encode_frame + guess - search, self.WINDOW_LENGTH + 2 * search
+            )
+            if source_prints is None:
+                continue
+            scores = offset_scores(encode_prints, source_prints, search)
+            shift = int(scores.argmax())
+            if best is None or scores[shift] > best[1]:
+                best = (guess + shift - search, float(scores[shift]))
+        return best
+
+    async def _match_score(self, encode_frame: int, offset: int) -> float:
+        """How well a short encode window centered on `encode_frame` matches `offset`"""
+        start = max(0, encode_frame - self.REFINE_LENGTH // 2)
+        length = min(self.REFINE_LENGTH, len(self.encode_clip) - start)
+        encode_prints = await self._encode_prints(start, length)
+        source_prints = await self._source_prints(start + offset, length)
+        if source_prints is None:
+            return float("-inf")
+        return float(offset_scores(encode_prints, source_prints, 0)[0])
+
+    async def _refine_change(
+        self, low: int, low_offset: int, high: int, high_offset: int
+    ) -> int:
+        """First encode frame between two anchors that follows `high_offset`"""
+        while high - low > 1:
+            middle = (low + high) // 2
+            low_score, high_score = await asyncio.gather(
+                self._match_score(middle, low_offset),
+                self._match_score(middle, high_offset),
+            )
+            if low_score >= high_score:
+                low = middle
+            else:
+                high = middle
+        return high
+
+    async def build(self, anchor_count: int = 16) -> DriftMap:
+        """
+        Matches evenly spaced anchors over the encode and builds the map.
+
+        Args:
+            anchor_count (int): Number of anchors
+
+        Returns:
+            (DriftMap): The frame map
+        """
+        last_start = len(self.encode_clip) - self.WINDOW_LENGTH
+        if last_start < 0:
+            raise ValueError("Encode is too short to build a drift map")
+
+        anchors = np.unique(
+            np.linspace(0, last_start, max(2, anchor_count), dtype=int)
+        ).tolist()
+
+        matched: list[tuple[int, int]] = []
+        previous_offset = 0
+        for anchor in anchors:
+            guesses = [previous_offset]
+            timestamp_offset = await self._timestamp_offset(anchor)
+            if timestamp_offset is not None:
+                guesses.insert(0, timestamp_offset)
+
+            anchor_match = await self._anchor_offset(anchor, guesses)
+            if anchor_match is None:
+                continue
+            previous_offset = anchor_match[0]
+            matched.append((anchor, previous_offset))
+
+        if not matched:
+            raise ValueError("No anchor could be matched")
+
+        segments = [(0, matched[0][1])]
+        for (low, low_offset), (high, high_offset) in pairwise(matched):
+            if low_offset != high_offset:
+                change = await self._refine_change(low, low_offset, high, high_offset)
+                segments.append((change, high_offset))
+        return DriftMap(segments)
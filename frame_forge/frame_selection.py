@@ -0,0 +1,316 @@
+import asyncio
+from typing import NamedTuple
+
+import numpy as np
+import vapoursynth as vs
+
+# width of the analysis clip, enough for scene changes and a rough measure of detail
+ANALYSIS_WIDTH = 160
+
+# histogram bins per plane (luma, chroma blue, chroma red) of the diversity selection
+HISTOGRAM_BINS = (16, 8, 8)
+HISTOGRAM_SIZE = (64, 36)
+
+# average full range luma (0 - 1) below which a frame counts as black
+BLACK_LEVEL = 0.06
+
+
+def full_range_luma_args(clip: vs.VideoNode) -> dict:
+    """
+    Resize arguments for a full range GRAY8 copy of the clip, so black is 0 instead of
+    16/255 for limited range video (RGB is full range already).
+    """
+    if clip.format.color_family == vs.RGB:
+        return {"matrix_s": "709"}
+    return {"range_in_s": "limited", "range_s": "full"}
+
+
+class FrameStats(NamedTuple):
+    # average full range luma (0 - 1)
+    brightness: float
+    # average absolute difference to the previous frame (0 - 1)
+    difference: float
+    # average edge strength (0 - 1)
+    detail: float
+
+
+class FrameScorer:
+    """
+    Scores frames for comparisons on a heavily downscaled luma clip.
+
+    Frames next to a scene change, inside fades or close to black are rejected, the
+    remaining frames are scored by spatial detail (edge strength) and penalized for
+    motion.
+    """
+
+    SCENE_CHANGE = 0.1
+    # per frame brightness change that's treated as a fade
+    FADE_STEP = 0.004
+
+    def __init__(self, core: vs.Core, clip: vs.VideoNode, in_flight: int = 8):
+        """
+        Args:
+            core (vs.Core): VapourSynth core
+            clip (vs.VideoNode): Clip to select frames from
+            in_flight (int): Number of frames requested at once
+        """
+        height = max(2, round(clip.height * ANALYSIS_WIDTH / clip.width / 2) * 2)
+        small = core.resize.Bilinear(
+            clip,
+            width=ANALYSIS_WIDTH,
+            height=height,
+            format=vs.GRAY8,
+            **full_range_luma_args(clip),
+        )
+
+        self.num_frames = len(clip)
+        # PlaneStatsDiff compares each frame with the one before it
+        self.stats_node = core.std.PlaneStats(small, small[0] + small[:-1])
+        self.detail_node = core.std.PlaneStats(core.std.Sobel(small))
+        self._semaphore = asyncio.Semaphore(max(1, in_flight))
+        self._cache: dict[int, FrameStats] = {}
+
+    async def frame_stats(self, frame: int) -> FrameStats:
+        cached = self._cache.get(frame)
+        if cached:
+            return cached
+
+        async with self._semaphore:
+            stats_frame, detail_frame = await asyncio.gather(
+                asyncio.wrap_future(self.stats_node.get_frame_async(frame)),
+                asyncio.wrap_future(self.detail_node.get_frame_async(frame)),
+            )
+        stats = FrameStats(
+            brightness=float(stats_frame.props["PlaneStatsAverage"]),
+            difference=float(stats_frame.props["PlaneStatsDiff"]),
+            detail=float(detail_frame.props["PlaneStatsAverage"]),
+        )
+        self._cache[frame] = stats
+        return stats
+
+    async def score(self, frame: int) -> float | None:
+        """
+        Scores a frame from its own stats and the next frame's.
+
+        Returns:
+            (float | None): Higher is better, None for transitions/black frames
+        """
+        following = min(frame + 1, self.num_frames - 1)
+        current, upcoming = await asyncio.gather(
+            self.frame_stats(frame), self.frame_stats(following)
+        )
+
+        if current.brightness < BLACK_LEVEL:
+            return None
+        # a cut right before or after the frame
+        if max(current.difference, upcoming.difference) > self.SCENE_CHANGE:
+            return None
+        # most of the change is a global brightness shift
+        brightness_step = abs(upcoming.brightness - current.brightness)
+        if (
+            brightness_step > self.FADE_STEP
+            and brightness_step > 0.5 * upcoming.difference
+        ):
+            return None
+
+        return current.detail * (1 - upcoming.difference / self.SCENE_CHANGE)
+
+    async def best_frames(
+        self, starts: list[int], span: int, samples: int = 4
+    ) -> list[int]:
+        """
+        Picks the best scored frame near each start frame.
+
+        Args:
+            starts (list[int]): Frames to start from
+            span (int): Candidates are spread over `start` to `start + span`
+            samples (int): Number of candidates per start frame
+
+        Returns:
+            (list[int]): Best candidate per start (the start if nothing qualifies)
+        """
+        last_frame = self.num_frames - 1
+
+        async def pick(start: int) -> int:
+            candidates = np.unique(
+                np.linspace(start, min(start + span, last_frame), samples, dtype=int)
+            ).tolist()
+            scores = await asyncio.gather(*[self.score(frame) for frame in candidates])
+            scored = [
+                (score, frame)
+                for score, frame in zip(scores, candidates)
+                if score is not None
+            ]
+            return max(scored)[1] if scored else start
+
+        return list(await asyncio.gather(*[pick(start) for start in starts]))
+
+
+def histogram_node(core: vs.Core, clip: vs.VideoNode) -> vs.VideoNode:
+    """Tiny 8-bit 4:4:4 copy of the clip for histograms"""
+    matrix = {"matrix_s": "709"} if clip.format.color_family == vs.RGB else {}
+    width, height = HISTOGRAM_SIZE
+    return core.resize.Bilinear(
+        clip, width=width, height=height, format=vs.YUV444P8, **matrix
+    )
+
+
+def frame_histogram(frame: vs.VideoFrame) -> np.ndarray:
+    """
+    Concatenated per-plane histograms of an 8-bit frame, square rooted so euclidean
+    distances between them are Hellinger distances.
+    """
+    histograms = []
+    for plane, bins in enumerate(HISTOGRAM_BINS):
+        samples = np.asarray(frame[plane]).ravel() // (256 // bins)
+        histogram = np.bincount(samples, minlength=bins).astype(np.float32)
+        histograms.append(np.sqrt(histogram / histogram.sum()))
+    return np.concatenate(histograms)
+
+
+def kmeans(
+    features: np.ndarray, clusters: int, iterations: int = 50, seed: int | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    K-means with k-means++ seeding.
+
+    Args:
+        features (np.ndarray): (samples, dimensions) array
+        clusters (int): Number of clusters (at most the number of samples)
+        iterations (int): Maximum number of refinement passes
+        seed (int | None): Random seed
+
+    Returns:
+        (tuple[np.ndarray, np.ndarray]): Centroids and the label of each sample
+    """
+    rng = np.random.default_rng(seed)
+    features = features.astype(np.float64)
+    clusters = min(clusters, len(features))
+
+    centroids = [features[rng.integers(len(features))]]
+    for _ in range(1, clusters):
+        distances = np.min(
+            ((features[:, np.newaxis] - np.array(centroids)) ** 2).sum(axis=2), axis=1
+        )
+        total = distances.sum()
+        if total <= 0:
+            centroids.append(features[rng.integers(len(features))])
+        else:
+            centroids.append(features[rng.choice(len(features), p=distances / total)])
+    centroid_array = np.array(centroids)
+
+    labels = np.zeros(len(features), dtype=np.intp)
+    for iteration in range(iterations):
+        distances = ((features[:, np.newaxis] - centroid_array) ** 2).sum(axis=2)
+        new_labels = distances.argmin(axis=1)
+        if iteration and (new_labels == labels).all():
+            break
+        labels = new_labels
+        for cluster in range(clusters):
+            members = features[labels == cluster]
+            if len(members):
+                centroid_array[cluster] = members.mean(axis=0)
+    return centroid_array, labels
+
+
+async def select_diverse_frames(
+    core: vs.Core,
+    clip: vs.VideoNode,
+    first_frame: int,
+    last_frame: int,
+    count: int,
+    samples: int = 300,
+    in_flight: int = 8,
+) -> list[int]:
+    """
+    Samples frames evenly, clusters their luma/chroma histograms and returns the sample
+    closest to each cluster's centroid, so rare content (i.e. dark or busy scenes) gets
+    its own comparison instead of long uniform scenes getting several.
+
+    Args:
+        core (vs.Core): VapourSynth core
+        clip (vs.VideoNode): Clip to select frames from
+        first_frame (int): First frame of the range to sample
+        last_frame (int): Last frame of the range to sample
+        count (int): Number of frames to select
+        samples (int): Number of frames to sample (at least 4 per selected frame)
+        in_flight (int): Number of frames requested at once
+
+    Returns:
+        (list[int]): Sorted representative frames
+    """
+    histogram_clip = histogram_node(core, clip)
+    sample_frames = np.unique(
+        np.linspace(first_frame, last_frame, max(samples, count * 4), dtype=int)
+    )
+    semaphore = asyncio.Semaphore(max(1, in_flight))
+
+    async def histogram(frame: int) -> np.ndarray:
+        async with semaphore:
+            return frame_histogram(
+                await asyncio.wrap_future(histogram_clip.get_frame_async(int(frame)))
+            )
+
+    features = np.stack(
+        await asyncio.gather(*[histogram(frame) for frame in sample_frames])
+    )
+    centroids, labels = kmeans(features, count)
+
+    representatives = []
+    for cluster, centroid in enumerate(centroids):
+        members = np.flatnonzero(labels == cluster)
+        if not len(members):
+            continue
+        distances = ((features[members] - centroid) ** 2).sum(axis=1)
+        representatives.append(int(sample_frames[members[distances.argmin()]]))
+    return sorted(set(representatives))
+
+
+class CandidateFilter:
+    """
+    Rejects black, flat (i.e. credits on black) and near-duplicate candidate frames
+    using PlaneStats and a tiny fingerprint of each frame.
+    """
+
+    # minimum standard deviation of the luma (0 - 1)
+    MIN_DEVIATION = 0.03
+    # fingerprints closer than this (mean absolute difference, 0 - 1) are duplicates
+    DUPLICATE_DIFFERENCE = 0.02
+
+    def __init__(self, core: vs.Core, clip: vs.VideoNode, in_flight: int = 8):
+        width, height = HISTOGRAM_SIZE
+        self.node = core.std.PlaneStats(
+            core.resize.Bilinear(
+                clip,
+                width=width,
+                height=height,
+                format=vs.GRAY8,
+                **full_range_luma_args(clip),
+            )
+        )
+        self._semaphore = asyncio.Semaphore(max(1, in_flight))
+
+    async def fingerprint(self, frame: int) -> np.ndarray | None:
+        """
+        Checks a frame's content.
+
+        Returns:
+            (np.ndarray | None): The frame's fingerprint (0 - 1), None for black or flat
+                frames
+        """
+        async with self._semaphore:
+            small_frame = await asyncio.wrap_future(self.node.get_frame_async(frame))
+        if float(small_frame.props["PlaneStatsAverage"]) < BLACK_LEVEL:
+            return None
+
+        fingerprint = np.asarray(small_frame[0], dtype=np.float32).ravel() / 255
+        if float(fingerprint.std()) < self.MIN_DEVIATION:
+            return None
+        return fingerprint
+
+    def is_duplicate(self, fingerprint: np.ndarray, accepted: list[np.ndarray]) -> bool:
+        """Whether the fingerprint nearly matches one of the accepted fingerprints"""
+        if not accepted:
+            return False
+        differences = np.abs(np.stack(accepted) - fingerprint).mean(axis=1)
+        return bool(differences.min() < self.DUPLICATE_DIFFERENCE)
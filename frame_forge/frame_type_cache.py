@@ -0,0 +1,86 @@
+import os
+import struct
+from pathlib import Path
+
+from frame_forge.utils import partial_file_hash
+
+
+class FrameTypeCache:
+    """
+    Persistent sidecar of per-frame picture types for a media file.
+
+    Picture types are stored as a packed byte array (one `_PictType` character per frame,
+    0 for frames that haven't been probed yet). The sidecar is keyed by the media file's
+    size, mtime and a partial content hash, so it's discarded if the file changes.
+    """
+
+    MAGIC = b"FFPT"
+    VERSION = 1
+    # magic, version, file size, mtime (ns), partial hash (16 bytes), frame count
+    HEADER = struct.Struct("<4sHQq16sI")
+    UNKNOWN = 0
+
+    def __init__(self, media_file: Path, num_frames: int, cache_path: Path):
+        self.media_file = Path(media_file)
+        self.num_frames = num_frames
+        self.cache_path = Path(cache_path)
+        self.pict_types = bytearray(num_frames)
+        self.dirty = False
+
+        stat = self.media_file.stat()
+        self._key = (
+            stat.st_size,
+            stat.st_mtime_ns,
+            bytes.fromhex(partial_file_hash(self.media_file)),
+            num_frames,
+        )
+
+    @classmethod
+    def load(cls, media_file: Path, num_frames: int, cache_path: Path):
+        """Loads the sidecar if it's valid for the media file, otherwise starts empty"""
+        cache = cls(media_file, num_frames, cache_path)
+        try:
+            data = cache.cache_path.read_bytes()
+        except OSError:
+            return cache
+
+        if len(data) != cls.HEADER.size + num_frames:
+            return cache
+
+        magic, version, *key = cls.HEADER.unpack_from(data)
+        if magic == cls.MAGIC and version == cls.VERSION and tuple(key) == cache._key:
+            cache.pict_types[:] = data[cls.HEADER.size :]
+        return cache
+
+    def get(self, frame: int) -> bytes | None:
+        """Returns the cached picture type (i.e. b"B") or None if unknown"""
+        if 0 <= frame < self.num_frames and self.pict_types[frame] != self.UNKNOWN:
+            return bytes(self.pict_types[frame : frame + 1])
+        return None
+
+    def set(self, frame: int, pict_type: str | bytes) -> None:
+        if isinstance(pict_type, str):
+            pict_type = pict_type.encode()
+        if (
+            0 <= frame < self.num_frames
+            and len(pict_type) == 1
+            and self.pict_types[frame] != pict_type[0]
+        ):
+            self.pict_types[frame] = pict_type[0]
+            self.dirty = True
+
+    def save(self) -> None:
+        """Writes the sidecar (atomically) if anything new was probed"""
+        if not self.dirty:
+            return
+
+        temp_path = self.cache_path.with_name(f"{self.cache_path.name}.tmp")
+        try:
+            temp_path.write_bytes(
+                self.HEADER.pack(self.MAGIC, self.VERSION, *self._key) + self.pict_types
+            )
+            os.replace(temp_path, self.cache_path)
+            self.dirty = False
+        except OSError:
+            # read-only media locations simply don't get a cache
+            temp_path.unlink(missing_ok=True)
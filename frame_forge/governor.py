@@ -0,0 +1,98 @@
+import vapoursynth as vs
+
+MIB = 1024 * 1024
+
+
+def frame_size(clip: vs.VideoNode) -> int:
+    """
+    Estimates the memory used by a single frame of the clip in bytes.
+
+    Args:
+        clip (vs.VideoNode): Clip with a constant format and resolution
+
+    Returns:
+        (int): Size of one frame in bytes
+    """
+    clip_format = clip.format
+    if clip_format is None or not clip.width or not clip.height:
+        raise ValueError("Clip must have a constant format and resolution")
+
+    luma = clip.width * clip.height
+    chroma = (clip.width >> clip_format.subsampling_w) * (
+        clip.height >> clip_format.subsampling_h
+    )
+    samples = luma + (clip_format.num_planes - 1) * chroma
+    return samples * clip_format.bytes_per_sample
+
+
+class ResourceGovernor:
+    """
+    Keeps VapourSynth's threads, frame cache and the number of in-flight frame requests
+    inside a memory budget.
+
+    Half of the budget goes to VapourSynth's frame cache, the rest bounds how many frames
+    probing and rendering may have in flight at once (estimated from each clip's format
+    and resolution). Without a budget the core's defaults are left alone and the in-flight
+    window is sized from the thread count.
+    """
+
+    # share of the budget handed to the frame cache
+    CACHE_SHARE = 0.5
+    # VapourSynth needs some cache to work with no matter how small the budget is
+    MIN_CACHE_MB = 256
+
+    def __init__(
+        self, core: vs.Core, memory_limit: int | None = None, threads: int | None = None
+    ):
+        """
+        Args:
+            core (vs.Core): The core to govern
+            memory_limit (int | None): Memory budget in MiB, None for no limit
+            threads (int | None): Number of VapourSynth threads, None for the default
+        """
+        self.core = core
+        self.memory_limit = memory_limit
+        # the core may be shared between runs (see FrameForge), restore() puts these back
+        self._previous_settings = (core.num_threads, core.max_cache_size)
+
+        if threads:
+            self.core.num_threads = threads
+
+        self.in_flight_budget: int | None = None
+        if self.memory_limit:
+            cache_mb = max(self.MIN_CACHE_MB, int(self.memory_limit * self.CACHE_SHARE))
+            self.core.max_cache_size = cache_mb
+            self.in_flight_budget = max(0, self.memory_limit - cache_mb) * MIB
+
+    def restore(self) -> None:
+        """Puts the core's thread count and cache size back to what they were before"""
+        self.core.num_threads, self.core.max_cache_size = self._previous_settings
+
+    def max_in_flight(self, *clips: vs.VideoNode, rgb_output: bool = False) -> int:
+        """
+        Number of frame requests that may be in flight at once for the clips.
+
+        Args:
+            *clips (vs.VideoNode): Clips the requests will be made from (the largest frame
+                size is used)
+            rgb_output (bool): Requests are converted to RGB24 for writing images, which
+                holds an extra frame per request
+
+        Returns:
+            (int): Window size (at least 1)
+        """
+        window = max(1, self.core.num_threads)
+        if self.in_flight_budget is None or not clips:
+            return window
+
+        request_size = 0
+        for clip in clips:
+            try:
+                clip_request = frame_size(clip)
+            except ValueError:
+                continue
+            if rgb_output:
+                clip_request += clip.width * clip.height * 3
+            request_size = max(request_size, clip_request)
+
+        return max(1, min(window, self.in_flight_budget // max(1, request_size)))
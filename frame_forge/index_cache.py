@@ -0,0 +1,109 @@
+import os
+import re
+from pathlib import Path
+
+import vapoursynth as vs
+
+from frame_forge.utils import partial_file_hash
+
+# an index that was cut short (crash/interrupt) is missing its closing tag
+LWI_HEADER = b"<LSMASHWorksIndexVersion="
+LWI_FOOTER = b"</LibavReaderIndexFile>"
+
+
+def indexer_version(core, indexer: str) -> str:
+    """
+    Returns a version string for the loaded indexer plugin, used as part of the
+    cache key so a plugin update never tries to read an incompatible index.
+    """
+    plugin = getattr(core, "lsmas" if indexer == "lsmash" else "ffms2", None)
+    if plugin is None:
+        return "unknown"
+
+    try:
+        version = plugin.Version()
+        version = version.get("version", version)
+    except (AttributeError, vs.Error):
+        version = getattr(plugin, "version", "unknown")
+
+    if isinstance(version, bytes):
+        version = version.decode(errors="ignore")
+    return re.sub(r"[^\w.-]", "_", str(version)) or "unknown"
+
+
+def index_header_valid(index_path: Path) -> bool:
+    """Checks an index file's header/trailer instead of trying to open it"""
+    try:
+        size = index_path.stat().st_size
+        with open(index_path, "rb") as index_file:
+            head = index_file.read(len(LWI_HEADER))
+            if index_path.suffix.lower() == ".lwi":
+                index_file.seek(max(0, size - 256))
+                return head == LWI_HEADER and LWI_FOOTER in index_file.read()
+            # ffms2 indexes are a single zlib stream
+            return size > 2 and head[:1] == b"\x78"
+    except OSError:
+        return False
+
+
+class IndexCache:
+    """
+    Central, content-addressed index cache directory.
+
+    Index files are named after a fast content fingerprint of the media file plus the
+    indexer and its version, so the same media is only indexed once no matter where it's
+    read from (read-only shares included). The directory is kept under `max_bytes` by
+    evicting the least recently used files.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int, core, indexer: str):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.indexer = indexer
+        self.version = indexer_version(core, indexer)
+
+    def index_path(self, media_file: Path, indexer_ext: str) -> Path:
+        """
+        Returns the cache path for the media file's index, a cached index that fails
+        the header check is removed so it's rebuilt.
+        """
+        fingerprint = partial_file_hash(Path(media_file))
+        index_path = (
+            self.cache_dir / f"{fingerprint}.{self.indexer}-{self.version}{indexer_ext}"
+        )
+        if index_path.exists():
+            if index_header_valid(index_path):
+                self.touch(index_path)
+            else:
+                index_path.unlink(missing_ok=True)
+        return index_path
+
+    @staticmethod
+    def touch(path: Path) -> None:
+        """Marks a cache file as recently used"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def evict(self, keep: list[Path] | None = None) -> None:
+        """Removes the least recently used files until the cache fits in `max_bytes`"""
+        keep_files = {Path(path).resolve() for path in keep or []}
+        entries = []
+        for entry in self.cache_dir.iterdir():
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total_bytes <= self.max_bytes:
+                break
+            if entry.resolve() in keep_files:
+                continue
+            try:
+                entry.unlink()
+                total_bytes -= size
+            except OSError:
+                continue
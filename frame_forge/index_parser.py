@@ -0,0 +1,123 @@
+import mmap
+import re
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+# AVPictureType -> av_get_picture_type_char(), same characters the source filters use for _PictType
+PICT_TYPE_CHARS = b"?IPBSipb"
+
+AV_NOPTS_VALUE = -(2**63)
+
+_ACTIVE_VIDEO_STREAM = re.compile(
+    rb"<ActiveVideoStreamIndex>([+-]?\d+)</ActiveVideoStreamIndex>"
+)
+_VIDEO_ENTRY = re.compile(
+    rb"Index=(\d+),POS=-?\d+,PTS=(-?\d+),DTS=(-?\d+),EDI=-?\d+\r?\n"
+    rb"Key=(\d+),Pic=(\d+),POC=-?\d+,Repeat=\d+,Field=(\d+)"
+)
+
+
+class IndexInfo(NamedTuple):
+    """Per-frame information read from an index, in presentation order"""
+
+    # one `_PictType` character per frame (i.e. `pict_types[n:n + 1] == b"B"`)
+    pict_types: bytes
+    # sorted frame numbers of the keyframes
+    keyframes: np.ndarray
+
+
+def read_pict_types(index_path: Path | str | None) -> bytes | None:
+    """
+    Reads the per-frame picture types recorded in an indexer cache file.
+
+    Args:
+        index_path (Path | str | None): Path to the .lwi/.ffindex file
+
+    Returns:
+        (bytes | None): One `_PictType` character per frame in presentation order
+            (i.e. `pict_types[n:n + 1] == b"B"`), None if it can't be determined
+    """
+    index_info = read_index_info(index_path)
+    return index_info.pict_types if index_info else None
+
+
+def read_index_info(index_path: Path | str | None) -> IndexInfo | None:
+    """
+    Reads the per-frame picture types and keyframes recorded in an indexer cache file.
+
+    Args:
+        index_path (Path | str | None): Path to the .lwi/.ffindex file
+
+    Returns:
+        (IndexInfo | None): Index information, None if it can't be determined
+    """
+    if not index_path:
+        return None
+
+    index_path = Path(index_path)
+    if not index_path.is_file():
+        return None
+
+    # .ffindex is a versioned zlib-compressed binary format that doesn't store
+    # picture types we can rely on, so only L-SMASH indexes are supported
+    if index_path.suffix.lower() == ".lwi":
+        return read_lwi_index(index_path)
+
+    return None
+
+
+def read_lwi_index(lwi_path: Path) -> IndexInfo | None:
+    """
+    Parses a memory-mapped L-SMASH `.lwi` index for the active video stream's picture
+    types and keyframes.
+
+    Args:
+        lwi_path (Path): Path to the .lwi file
+
+    Returns:
+        (IndexInfo | None): Index information in presentation order, None if the index
+            can't be parsed or is field coded
+    """
+    try:
+        with (
+            open(lwi_path, "rb") as index_file,
+            mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped,
+        ):
+            active_stream = _ACTIVE_VIDEO_STREAM.search(mapped)
+            if not active_stream or int(active_stream.group(1)) < 0:
+                return None
+            video_stream = int(active_stream.group(1))
+
+            pts, dts, keys, pics = [], [], [], []
+            for entry in _VIDEO_ENTRY.finditer(mapped):
+                if int(entry.group(1)) != video_stream:
+                    continue
+                # separate field entries don't map 1:1 to output frames
+                if entry.group(6) != b"0":
+                    return None
+                pts.append(int(entry.group(2)))
+                dts.append(int(entry.group(3)))
+                keys.append(entry.group(4) != b"0")
+                pics.append(int(entry.group(5)))
+    except (OSError, ValueError):
+        return None
+
+    if not pics:
+        return None
+
+    # the index is stored in decode order, frames are served in presentation order
+    timestamps = np.array(pts, dtype=np.int64)
+    if (timestamps == AV_NOPTS_VALUE).any():
+        timestamps = np.array(dts, dtype=np.int64)
+    order = np.argsort(timestamps, kind="stable")
+
+    pict_chars = np.frombuffer(PICT_TYPE_CHARS, dtype=np.uint8)
+    pic_codes = np.array(pics, dtype=np.intp)
+    pic_codes[(pic_codes < 0) | (pic_codes >= len(PICT_TYPE_CHARS))] = 0
+
+    return IndexInfo(
+        pict_types=pict_chars[pic_codes[order]].tobytes(),
+        keyframes=np.flatnonzero(np.array(keys, dtype=bool)[order]),
+    )
@@ -0,0 +1,160 @@
+import multiprocessing
+import re
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from time import perf_counter
+
+import vapoursynth as vs
+
+from frame_forge.utils import load_plugins
+
+# lsmash writes the byte position of every indexed packet, i.e. 'Index=0,POS=1234,...'
+LWI_POSITION = re.compile(rb"POS=(\d+)")
+# enough of the end of the index to hold a few packet lines
+PROGRESS_TAIL = 64 * 1024
+
+
+def index_progress(media_file: Path, cache_path: Path) -> float | None:
+    """
+    Estimates how far an index that's being written has got from the position of the
+    last packet in it (lsmash only, ffms2 writes its index at the end).
+
+    Returns:
+        (float | None): Progress (0 - 1), None if it can't be estimated
+    """
+    if cache_path.suffix.lower() != ".lwi":
+        return None
+    try:
+        media_size = media_file.stat().st_size
+        with open(cache_path, "rb") as index_file:
+            index_file.seek(max(0, index_file.seek(0, 2) - PROGRESS_TAIL))
+            positions = LWI_POSITION.findall(index_file.read())
+    except OSError:
+        return 0.0
+    if not positions or not media_size:
+        return 0.0
+    return min(1.0, int(positions[-1]) / media_size)
+
+
+def build_index(indexer: str, media_file: str, cache_path: str) -> float:
+    """
+    Builds an index cache file for the media file (runs in a worker process).
+
+    Args:
+        indexer (str): 'lsmash' or 'ffms2'
+        media_file (str): Path to media file
+        cache_path (str): Path to write the index to
+
+    Returns:
+        (float): Seconds spent indexing
+    """
+    start = perf_counter()
+    core = vs.core
+    load_plugins(core)
+
+    if indexer == "lsmash":
+        core.lsmas.LWLibavSource(source=media_file, cachefile=cache_path)
+    else:
+        core.ffms2.Source(media_file, cachefile=cache_path)
+
+    return perf_counter() - start
+
+
+def build_indexes(
+    indexer: str,
+    jobs: dict[str, tuple[Path, Path]],
+    status_interval: float = 10.0,
+) -> dict[str, bool]:
+    """
+    Indexes several media files at the same time, each in its own worker process.
+
+    Args:
+        indexer (str): 'lsmash' or 'ffms2'
+        jobs (dict[str, tuple[Path, Path]]): Label -> (media file, index cache path)
+        status_interval (float): Seconds between combined progress messages (per file
+            and combined percentages for lsmash, weighted by file size)
+
+    Returns:
+        (dict[str, bool]): Label -> whether the index was built, failed jobs are
+            simply indexed again the regular way by the caller
+    """
+    labels = " and ".join(jobs)
+    print(f"Indexing {labels} in parallel", flush=True)
+
+    results = {label: False for label in jobs}
+    status = {label: "indexing" for label in jobs}
+    start = perf_counter()
+
+    # spawn, forking after the core (and its threads in service mode) is up can
+    # deadlock the children
+    with ProcessPoolExecutor(
+        max_workers=len(jobs), mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures: dict[Future, str] = {
+            executor.submit(build_index, indexer, str(media), str(cache)): label
+            for label, (media, cache) in jobs.items()
+        }
+        pending = set(futures)
+
+        while pending:
+            done, pending = wait(
+                pending, timeout=status_interval, return_when=FIRST_COMPLETED
+            )
+
+            for future in done:
+                label = futures[future]
+                try:
+                    elapsed = future.result()
+                    results[label] = True
+                    status[label] = "done"
+                    print(
+                        f"{label.capitalize()} index completed ({elapsed:.1f}s)",
+                        flush=True,
+                    )
+                except (vs.Error, OSError, BrokenProcessPool) as index_error:
+                    status[label] = "failed"
+                    print(
+                        f"Parallel indexing of {label} failed ({index_error}), "
+                        "it will be indexed again",
+                        flush=True,
+                    )
+
+            if pending and not done:
+                print(
+                    f"Indexing... {perf_counter() - start:.0f}s elapsed "
+                    f"({combined_progress(jobs, status)})",
+                    flush=True,
+                )
+
+    return results
+
+
+def combined_progress(
+    jobs: dict[str, tuple[Path, Path]], status: dict[str, str]
+) -> str:
+    """Per file progress plus the combined percentage (weighted by file size)"""
+    parts = []
+    done_bytes = total_bytes = 0
+    estimated = True
+    for label, (media, cache) in jobs.items():
+        try:
+            media_size = media.stat().st_size
+        except OSError:
+            media_size = 0
+        if status[label] == "indexing":
+            fraction = index_progress(media, cache)
+        else:
+            fraction = 1.0 if status[label] == "done" else None
+
+        if fraction is None:
+            estimated = False
+            parts.append(f"{label}: {status[label]}")
+        else:
+            done_bytes += fraction * media_size
+            parts.append(f"{label}: {fraction:.0%}")
+        total_bytes += media_size
+
+    if estimated and total_bytes:
+        parts.append(f"total: {done_bytes / total_bytes:.0%}")
+    return ", ".join(parts)
@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import vapoursynth as vs
+
+from frame_forge.render import RenderJob
+
+# SSIM constants (Wang et al.), gaussian window of 11 taps with sigma 1.5
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+SSIM_SIGMA = 1.5
+SSIM_RADIUS = 5
+
+# planes are compared on an 8-bit scale so clips of different bit depths can be paired
+# (MAE is reported in 8-bit sample values)
+METRICS_PEAK = 255.0
+
+
+class FrameMetrics(NamedTuple):
+    psnr: float
+    ssim: float
+    mae: float
+
+
+def metrics_node(core: vs.Core, clip: vs.VideoNode) -> vs.VideoNode:
+    """Luma of the clip (RGB is converted to 16-bit luma)"""
+    if clip.format.color_family == vs.RGB:
+        return core.resize.Point(clip, format=vs.GRAY16, matrix_s="709")
+    return core.std.ShufflePlanes(clip, planes=0, colorfamily=vs.GRAY)
+
+
+def eight_bit_scale(frame: vs.VideoFrame) -> float:
+    """Factor that brings the frame's samples to an 8-bit scale"""
+    if frame.format.sample_type == vs.FLOAT:
+        return METRICS_PEAK
+    return 2.0 ** (8 - frame.format.bits_per_sample)
+
+
+def _gaussian_blur(plane: np.ndarray, kernel: np.ndarray) -> np.ndarray:
+    """Separable 'valid' convolution (no padding) along both axes"""
+    taps = len(kernel)
+    height, width = plane.shape[0] - taps + 1, plane.shape[1] - taps + 1
+    dtype = np.result_type(plane, kernel)
+
+    rows = np.zeros((height, plane.shape[1]), dtype=dtype)
+    for tap, weight in enumerate(kernel):
+        rows += weight * plane[tap : tap + height]
+
+    blurred = np.zeros((height, width), dtype=dtype)
+    for tap, weight in enumerate(kernel):
+        blurred += weight * rows[:, tap : tap + width]
+    return blurred
+
+
+def psnr(reference: np.ndarray, distorted: np.ndarray, peak: float) -> float:
+    mse = float(np.mean(np.square(reference - distorted)))
+    if mse == 0:
+        return float("inf")
+    return float(10 * np.log10(peak**2 / mse))
+
+
+def ssim(reference: np.ndarray, distorted: np.ndarray, peak: float) -> float:
+    """Mean SSIM over the image using a gaussian window"""
+    offsets = np.arange(-SSIM_RADIUS, SSIM_RADIUS + 1)
+    kernel = np.exp(-(offsets**2) / (2 * SSIM_SIGMA**2))
+    kernel = (kernel / kernel.sum()).astype(np.float32)
+
+    c1 = (SSIM_K1 * peak) ** 2
+    c2 = (SSIM_K2 * peak) ** 2
+
+    mu_x = _gaussian_blur(reference, kernel)
+    mu_y = _gaussian_blur(distorted, kernel)
+    mu_xx, mu_yy, mu_xy = mu_x * mu_x, mu_y * mu_y, mu_x * mu_y
+    sigma_xx = _gaussian_blur(reference * reference, kernel) - mu_xx
+    sigma_yy = _gaussian_blur(distorted * distorted, kernel) - mu_yy
+    sigma_xy = _gaussian_blur(reference * distorted, kernel) - mu_xy
+
+    ssim_map = ((2 * mu_xy + c1) * (2 * sigma_xy + c2)) / (
+        (mu_xx + mu_yy + c1) * (sigma_xx + sigma_yy + c2)
+    )
+    return float(ssim_map.mean())
+
+
+def compare_planes(
+    reference: np.ndarray, distorted: np.ndarray, peak: float
+) -> FrameMetrics:
+    """
+    Computes PSNR, SSIM and mean absolute error of two planes.
+
+    Args:
+        reference (np.ndarray): Source plane
+        distorted (np.ndarray): Encode plane (same shape)
+        peak (float): Largest sample value
+
+    Returns:
+        (FrameMetrics): Metrics of the pair (MAE in sample values)
+    """
+    reference = reference.astype(np.float32)
+    distorted = distorted.astype(np.float32)
+    return FrameMetrics(
+        psnr=psnr(reference, distorted, peak),
+        ssim=ssim(reference, distorted, peak),
+        mae=float(np.mean(np.abs(reference - distorted))),
+    )
+
+
+class MetricsCollector:
+    """
+    Pairs captured source/encode planes as they're rendered and computes the pair's
+    metrics as soon as both are in, so only unmatched planes are kept in memory.
+    """
+
+    def __init__(self, source_jobs: list[RenderJob], encode_jobs: list[RenderJob]):
+        self.pairs = list(zip(source_jobs, encode_jobs))
+        self._pair_index = {
+            job.path: idx for idx, pair in enumerate(self.pairs) for job in pair
+        }
+        self._pending: dict[Path, np.ndarray] = {}
+        self.results: dict[int, FrameMetrics | None] = {}
+        self._lock = threading.Lock()
+
+    def add(self, job: RenderJob, frame: vs.VideoFrame) -> None:
+        """Stores a captured frame's plane, computes the pair's metrics once both are in"""
+        idx = self._pair_index.get(job.path)
+        if idx is None:
+            return
+        plane = np.asarray(frame[0], dtype=np.float32) * eight_bit_scale(frame)
+
+        source_job, encode_job = self.pairs[idx]
+        partner = encode_job if job.path == source_job.path else source_job
+        with self._lock:
+            partner_plane = self._pending.pop(partner.path, None)
+            if partner_plane is None:
+                self._pending[job.path] = plane
+                return
+
+        if job.path == source_job.path:
+            reference, distorted = plane, partner_plane
+        else:
+            reference, distorted = partner_plane, plane
+
+        self.results[idx] = (
+            compare_planes(reference, distorted, METRICS_PEAK)
+            if reference.shape == distorted.shape
+            else None
+        )
+
+    def report(self) -> dict:
+        """Per-comparison metrics and their averages (the content of metrics.json)"""
+
+        def number(value: float) -> float | None:
+            # JSON has no infinity (identical frames)
+            return round(value, 6) if np.isfinite(value) else None
+
+        comparisons = []
+        for idx, (source_job, encode_job) in enumerate(self.pairs):
+            frame_metrics = self.results.get(idx)
+            comparisons.append(
+                {
+                    "comparison": idx + 1,
+                    "source_frame": source_job.frame,
+                    "encode_frame": encode_job.frame,
+                    "source_image": source_job.path.name,
+                    "encode_image": encode_job.path.name,
+                    **(
+                        {
+                            key: number(value)
+                            for key, value in frame_metrics._asdict().items()
+                        }
+                        if frame_metrics
+                        else dict.fromkeys(FrameMetrics._fields)
+                    ),
+                }
+            )
+
+        computed = [metric for metric in self.results.values() if metric]
+        average = {
+            key: number(float(np.mean([getattr(metric, key) for metric in computed])))
+            if computed
+            else None
+            for key in FrameMetrics._fields
+        }
+
+        return {"comparisons": comparisons, "average": average}
+
+    def write(self, json_path: Path) -> None:
+        """Writes the per-comparison metrics and their averages to a JSON file"""
+        json_path = Path(json_path)
+        temp_path = json_path.with_name(f"{json_path.name}.tmp")
+        temp_path.write_text(json.dumps(self.report(), indent=2))
+        os.replace(temp_path, json_path)
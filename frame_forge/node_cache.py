@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import vapoursynth as vs
+
+from frame_forge.frame_type_cache import FrameTypeCache
+
+
+class SourceEntry(NamedTuple):
+    """An opened source file and what was read from its index"""
+
+    node: vs.VideoNode
+    keyframes: np.ndarray | None
+    index_path: Path
+
+
+class EncodeEntry(NamedTuple):
+    """An opened encode file and what was read from its index"""
+
+    node: vs.VideoNode
+    pict_types: bytes | None
+    keyframes: np.ndarray | None
+    frame_type_cache: FrameTypeCache | None
+    index_path: Path
+
+
+def file_key(indexer: str, media_file: Path) -> tuple:
+    """Cache key of a media file, a changed file (size/modification time) is a miss"""
+    media_path = Path(media_file).resolve()
+    stat = media_path.stat()
+    return indexer, str(media_path), stat.st_size, stat.st_mtime_ns
+
+
+class NodeCache:
+    """
+    Least recently used cache of opened source/encode nodes, kept warm between runs
+    that share a core (i.e. many encodes compared against the same source).
+    """
+
+    def __init__(self, capacity: int = 8):
+        """
+        Args:
+            capacity (int): Number of opened files to keep (sources and encodes)
+        """
+        self.capacity = max(1, capacity)
+        self._entries: OrderedDict[tuple, SourceEntry | EncodeEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> SourceEntry | EncodeEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: tuple, entry: SourceEntry | EncodeEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            # dropping the last reference to a node releases its decoder
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def files(self) -> list[str]:
+        """Paths of the cached files, most recently used last"""
+        with self._lock:
+            return [key[1] for key in self._entries]
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,95 @@
+from collections.abc import Iterable
+
+import numpy as np
+import vapoursynth as vs
+
+from frame_forge.render import DecodeJob, RenderJob
+
+
+class FrameAccessPlanner:
+    """
+    Orders frame requests by decode position and merges nearby requests into
+    sequential runs.
+
+    For each gap between two requested frames a simple cost model decides whether to
+    decode forward through the gap or to let the decoder seek. Seeking costs a fixed
+    `seek_cost` (in frames) plus decoding from the last keyframe before the target.
+    Without keyframe information the keyframe distance is estimated as half a GOP.
+    """
+
+    SEEK_COST = 24
+    GOP_ESTIMATE = 240
+
+    def __init__(
+        self,
+        keyframes: np.ndarray | None = None,
+        seek_cost: int = SEEK_COST,
+        gop_estimate: int = GOP_ESTIMATE,
+    ):
+        self.keyframes = (
+            np.asarray(keyframes, dtype=np.int64) if keyframes is not None else None
+        )
+        self.seek_cost = seek_cost
+        self.gop_estimate = gop_estimate
+
+    def last_keyframe(self, frame: int) -> int:
+        """Returns the last keyframe at or before the frame (or an estimate)"""
+        if self.keyframes is None or not len(self.keyframes):
+            return max(0, frame - self.gop_estimate // 2)
+        idx = int(np.searchsorted(self.keyframes, frame, side="right")) - 1
+        return int(self.keyframes[idx]) if idx >= 0 else 0
+
+    def decode_forward(self, previous: int, frame: int) -> bool:
+        """Whether decoding forward from `previous` to `frame` beats seeking"""
+        keyframe = self.last_keyframe(frame)
+        # no keyframe in between, a seek would land before `previous` anyway
+        if keyframe <= previous:
+            return True
+        return frame - previous <= self.seek_cost + (frame - keyframe)
+
+    def plan(self, frames: Iterable[int]) -> list[tuple[int, int]]:
+        """
+        Sorts the frames and merges them into runs.
+
+        Args:
+            frames (Iterable[int]): Requested frames (in any order, duplicates allowed)
+
+        Returns:
+            (list[tuple[int, int]]): Inclusive (start, end) ranges to decode in order
+        """
+        runs: list[tuple[int, int]] = []
+        for frame in sorted({int(frame) for frame in frames}):
+            if runs and self.decode_forward(runs[-1][1], frame):
+                runs[-1] = (runs[-1][0], frame)
+            else:
+                runs.append((frame, frame))
+        return runs
+
+    def sequence(
+        self, jobs: list[RenderJob], decode_clip: vs.VideoNode | None = None
+    ) -> list[RenderJob | DecodeJob]:
+        """
+        Orders render jobs by decode position. Frames inside a run that aren't requested
+        are decoded from `decode_clip` (without overlays/writing) so the decoder reads
+        forward instead of seeking.
+
+        Args:
+            jobs (list[RenderJob]): Render jobs of a single clip
+            decode_clip (vs.VideoNode | None): Clip (frame aligned with the jobs) used for
+                decode-only frames, runs aren't filled without it
+
+        Returns:
+            (list[RenderJob | DecodeJob]): Jobs in decode order
+        """
+        jobs_by_frame: dict[int, list[RenderJob]] = {}
+        for job in jobs:
+            jobs_by_frame.setdefault(job.frame, []).append(job)
+
+        ordered: list[RenderJob | DecodeJob] = []
+        for start, end in self.plan(jobs_by_frame):
+            for frame in range(start, end + 1):
+                if frame in jobs_by_frame:
+                    ordered.extend(jobs_by_frame[frame])
+                elif decode_clip is not None:
+                    ordered.append(DecodeJob(decode_clip, frame))
+        return ordered
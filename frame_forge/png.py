@@ -0,0 +1,207 @@
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG row filter types
+PNG_FILTERS = {"none": 0, "sub": 1, "up": 2, "average": 3, "paeth": 4}
+PNG_FILTER_CHOICES = (*PNG_FILTERS, "adaptive")
+
+ZLIB_STRATEGIES = {
+    "default": zlib.Z_DEFAULT_STRATEGY,
+    "filtered": zlib.Z_FILTERED,
+    "rle": zlib.Z_RLE,
+}
+
+# rows are compressed in bands of at least this many bytes
+MIN_BAND_BYTES = 256 * 1024
+
+
+def filter_rows(
+    rows: np.ndarray, prev_row: np.ndarray, filter_type: int, bpp: int = 3
+) -> np.ndarray:
+    """
+    Applies a PNG filter to a band of rows.
+
+    Args:
+        rows (np.ndarray): (rows, row_bytes) uint8 image rows
+        prev_row (np.ndarray): The row above the band (zeros for the first band)
+        filter_type (int): PNG filter type
+        bpp (int): Bytes per pixel
+
+    Returns:
+        (np.ndarray): Filtered rows (uint8)
+    """
+    if filter_type == 0:
+        return rows
+
+    cur = rows.astype(np.int16)
+    up = np.vstack((prev_row[np.newaxis], rows[:-1])).astype(np.int16)
+    left = np.zeros_like(cur)
+    left[:, bpp:] = cur[:, :-bpp]
+
+    if filter_type == 1:
+        predicted = left
+    elif filter_type == 2:
+        predicted = up
+    elif filter_type == 3:
+        predicted = (left + up) >> 1
+    else:
+        up_left = np.zeros_like(cur)
+        up_left[:, bpp:] = up[:, :-bpp]
+        base = left + up - up_left
+        dist_left = np.abs(base - left)
+        dist_up = np.abs(base - up)
+        dist_up_left = np.abs(base - up_left)
+        predicted = np.where(
+            (dist_left <= dist_up) & (dist_left <= dist_up_left),
+            left,
+            np.where(dist_up <= dist_up_left, up, up_left),
+        )
+
+    return (cur - predicted).astype(np.uint8)
+
+
+def filter_band(
+    rows: np.ndarray, prev_row: np.ndarray, filter_name: str, bpp: int = 3
+) -> bytes:
+    """Filters a band of rows, prefixing each row with its filter type byte"""
+    if filter_name == "adaptive":
+        # pick the filter with the smallest sum of absolute (signed) differences per row
+        candidates = [
+            filter_rows(rows, prev_row, filter_type, bpp)
+            for filter_type in range(len(PNG_FILTERS))
+        ]
+        scores = np.stack(
+            [np.abs(c.view(np.int8).astype(np.int32)).sum(axis=1) for c in candidates]
+        )
+        filter_types = scores.argmin(axis=0).astype(np.uint8)
+        filtered = np.stack(candidates)[filter_types, np.arange(len(rows))]
+    else:
+        filter_type = PNG_FILTERS[filter_name]
+        filtered = filter_rows(rows, prev_row, filter_type, bpp)
+        filter_types = np.full(len(rows), filter_type, dtype=np.uint8)
+
+    return np.hstack((filter_types[:, np.newaxis], filtered)).tobytes()
+
+
+def png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + chunk_type
+        + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data))
+    )
+
+
+class PngEncoder:
+    """
+    Multi-threaded PNG encoder for 8-bit RGB NumPy arrays.
+
+    The image is split into bands of rows, each band is filtered and deflated on a
+    thread pool (NumPy and zlib both release the GIL). Bands are flushed on byte
+    boundaries and primed with the previous band's last 32 KiB as a dictionary, so the
+    pieces join into a single valid zlib stream with little loss in compression.
+    """
+
+    WINDOW_SIZE = 32 * 1024
+
+    def __init__(
+        self,
+        compression_level: int = 6,
+        filter_name: str = "adaptive",
+        strategy: str = "default",
+        threads: int | None = None,
+    ):
+        if filter_name not in PNG_FILTER_CHOICES:
+            raise ValueError(f"PNG filter must be one of {PNG_FILTER_CHOICES}")
+        if strategy not in ZLIB_STRATEGIES:
+            raise ValueError(f"zlib strategy must be one of {tuple(ZLIB_STRATEGIES)}")
+
+        self.compression_level = compression_level
+        self.filter_name = filter_name
+        self.strategy = ZLIB_STRATEGIES[strategy]
+        self.threads = max(1, threads or os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.threads, thread_name_prefix="png"
+        )
+
+    def encode(self, rgb: np.ndarray) -> bytes:
+        """
+        Encodes an image to PNG.
+
+        Args:
+            rgb (np.ndarray): (height, width, 3) uint8 array
+
+        Returns:
+            (bytes): PNG file contents
+        """
+        if rgb.ndim != 3 or rgb.shape[2] != 3 or rgb.dtype != np.uint8:
+            raise ValueError("PngEncoder expects a (height, width, 3) uint8 array")
+
+        height, width = rgb.shape[:2]
+        rows = np.ascontiguousarray(rgb).reshape(height, width * 3)
+
+        rows_per_band = max(1, MIN_BAND_BYTES // max(1, width * 3))
+        rows_per_band = max(rows_per_band, -(-height // (self.threads * 4)))
+        band_starts = list(range(0, height, rows_per_band))
+
+        filtered_bands = list(
+            self._executor.map(
+                lambda start: filter_band(
+                    rows[start : start + rows_per_band],
+                    rows[start - 1] if start else np.zeros(width * 3, dtype=np.uint8),
+                    self.filter_name,
+                ),
+                band_starts,
+            )
+        )
+
+        def deflate_band(idx: int) -> bytes:
+            band = filtered_bands[idx]
+            zdict = filtered_bands[idx - 1][-self.WINDOW_SIZE :] if idx else None
+            compressor = (
+                zlib.compressobj(
+                    self.compression_level, zlib.DEFLATED, -15, 9, self.strategy, zdict
+                )
+                if zdict
+                else zlib.compressobj(
+                    self.compression_level, zlib.DEFLATED, -15, 9, self.strategy
+                )
+            )
+            last = idx == len(filtered_bands) - 1
+            return compressor.compress(band) + compressor.flush(
+                zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH
+            )
+
+        deflated = b"".join(
+            self._executor.map(deflate_band, range(len(filtered_bands)))
+        )
+
+        checksum = 1
+        for band in filtered_bands:
+            checksum = zlib.adler32(band, checksum)
+        # zlib header (deflate, 32K window) + raw deflate stream + adler32 trailer
+        idat = b"\x78\x9c" + deflated + struct.pack(">I", checksum)
+
+        ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+        return (
+            PNG_SIGNATURE
+            + png_chunk(b"IHDR", ihdr)
+            + png_chunk(b"IDAT", idat)
+            + png_chunk(b"IEND", b"")
+        )
+
+    def write(self, rgb: np.ndarray, path: Path) -> Path:
+        """Encodes and writes the image to `path`"""
+        path = Path(path)
+        path.write_bytes(self.encode(rgb))
+        return path
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
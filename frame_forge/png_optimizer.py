@@ -0,0 +1,190 @@
+import multiprocessing
+import os
+import struct
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from frame_forge.png import PNG_SIGNATURE, filter_band, png_chunk
+
+# color type -> channels, only 8-bit grayscale/RGB/gray-alpha/RGBA are re-filtered
+_CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}
+# fpng's private chunk marking its own output (its fast decoder relies on it), it no
+# longer applies once the IDAT is replaced
+_FPNG_CHUNK = b"fdEC"
+
+
+class OptimizeResult(NamedTuple):
+    path: Path
+    original_size: int
+    optimized_size: int
+
+
+def _read_chunks(data: bytes) -> list[tuple[bytes, bytes]]:
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file")
+
+    chunks = []
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos : pos + 8])
+        chunks.append((chunk_type, data[pos + 8 : pos + 8 + length]))
+        pos += 12 + length
+        if chunk_type == b"IEND":
+            break
+    return chunks
+
+
+def _unfilter(raw: bytes, width: int, height: int, bpp: int) -> np.ndarray | None:
+    """
+    Reverses PNG row filtering. Only none/sub/up filtered rows are handled (what the
+    fast encoders emit), None is returned for anything else.
+    """
+    row_bytes = width * bpp
+    rows = np.frombuffer(raw, dtype=np.uint8).reshape(height, row_bytes + 1)
+    filter_types = rows[:, 0]
+    if (filter_types > 2).any():
+        return None
+
+    pixels = np.empty((height, row_bytes), dtype=np.uint8)
+    prev_row = np.zeros(row_bytes, dtype=np.uint8)
+    for y in range(height):
+        row = rows[y, 1:]
+        if filter_types[y] == 1:
+            row = np.cumsum(row.reshape(width, bpp), axis=0, dtype=np.uint8).reshape(
+                row_bytes
+            )
+        elif filter_types[y] == 2:
+            row = row + prev_row
+        pixels[y] = row
+        prev_row = pixels[y]
+    return pixels
+
+
+def optimize_png(path: Path | str, level: int = 9) -> OptimizeResult:
+    """
+    Recompresses a PNG with stronger deflate settings (and re-filters it per row where
+    possible), the file is only replaced if the result is smaller.
+
+    Args:
+        path (Path | str): PNG file to optimize in place
+        level (int): zlib compression level
+
+    Returns:
+        (OptimizeResult): Sizes before and after (equal if the file was kept)
+    """
+    path = Path(path)
+    data = path.read_bytes()
+    original_size = len(data)
+
+    try:
+        chunks = _read_chunks(data)
+        width, height, bit_depth, color_type, _, _, interlace = struct.unpack(
+            ">IIBBBBB", chunks[0][1]
+        )
+        original_idat = b"".join(
+            chunk for chunk_type, chunk in chunks if chunk_type == b"IDAT"
+        )
+        raw = zlib.decompress(original_idat)
+    except (ValueError, IndexError, struct.error, zlib.error):
+        return OptimizeResult(path, original_size, original_size)
+
+    candidates = [raw]
+    channels = _CHANNELS.get(color_type)
+    if bit_depth == 8 and channels and not interlace:
+        pixels = _unfilter(raw, width, height, channels)
+        if pixels is not None:
+            candidates.append(
+                filter_band(
+                    pixels,
+                    np.zeros(width * channels, dtype=np.uint8),
+                    "adaptive",
+                    channels,
+                )
+            )
+
+    best_idat = original_idat
+    for candidate in candidates:
+        for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+            compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 9, strategy)
+            idat = compressor.compress(candidate) + compressor.flush()
+            if len(idat) < len(best_idat):
+                best_idat = idat
+
+    if best_idat is original_idat:
+        return OptimizeResult(path, original_size, original_size)
+
+    optimized = PNG_SIGNATURE
+    idat_written = False
+    for chunk_type, chunk in chunks:
+        if chunk_type == b"IDAT":
+            if not idat_written:
+                optimized += png_chunk(b"IDAT", best_idat)
+                idat_written = True
+        elif chunk_type != _FPNG_CHUNK:
+            optimized += png_chunk(chunk_type, chunk)
+
+    if len(optimized) >= original_size:
+        return OptimizeResult(path, original_size, original_size)
+
+    temp_path = path.with_name(f"{path.name}.tmp")
+    temp_path.write_bytes(optimized)
+    os.replace(temp_path, path)
+    return OptimizeResult(path, original_size, len(optimized))
+
+
+class PngOptimizer:
+    """
+    Optimizes PNGs on a process pool in the background.
+
+    Images are queued as soon as they're written, so recompression overlaps with
+    rendering the remaining frames. `finish()` waits for the queue to drain.
+    """
+
+    def __init__(self, workers: int | None = None, level: int = 9):
+        """
+        Args:
+            workers (int | None): Number of worker processes, defaults to half the CPU
+                threads (the rest is left to VapourSynth while rendering)
+            level (int): zlib compression level
+        """
+        self.workers = max(1, workers or (os.cpu_count() or 2) // 2)
+        self.level = level
+        self._executor: ProcessPoolExecutor | None = None
+        self._futures: list[Future] = []
+
+    def submit(self, path: Path) -> None:
+        """Queues an image for optimization"""
+        if self._executor is None:
+            # spawn, forking while VapourSynth's threads are rendering can deadlock
+            # the children
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        self._futures.append(self._executor.submit(optimize_png, path, self.level))
+
+    def finish(self) -> list[OptimizeResult]:
+        """
+        Waits for all queued images and shuts down the pool.
+
+        Returns:
+            (list[OptimizeResult]): Results of the images that were optimized
+        """
+        results = []
+        for future in self._futures:
+            try:
+                results.append(future.result())
+            except (OSError, ValueError):
+                continue
+        self.close()
+        return results
+
+    def close(self) -> None:
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        self._futures.clear()
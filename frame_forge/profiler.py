@@ -0,0 +1,179 @@
+import cProfile
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+# latency histogram bucket upper bounds in milliseconds (the last bucket is open ended)
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def peak_rss_bytes() -> int | None:
+    """Peak resident set size of the process, None if it can't be determined"""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        try:
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(
+                process, ctypes.byref(counters), counters.cb
+            ):
+                return int(counters.PeakWorkingSetSize)
+        except (AttributeError, OSError):
+            pass
+        return None
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+def latency_summary(latencies: list[float]) -> dict:
+    """Count, percentiles and histogram of latencies given in seconds"""
+    milliseconds = np.array(latencies, dtype=np.float64) * 1000
+    bucket_counts = np.bincount(
+        np.searchsorted(LATENCY_BUCKETS_MS, milliseconds, side="left"),
+        minlength=len(LATENCY_BUCKETS_MS) + 1,
+    )
+    labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [
+        f">{LATENCY_BUCKETS_MS[-1]}ms"
+    ]
+    return {
+        "count": len(latencies),
+        "mean_ms": round(float(milliseconds.mean()), 3),
+        "p50_ms": round(float(np.percentile(milliseconds, 50)), 3),
+        "p95_ms": round(float(np.percentile(milliseconds, 95)), 3),
+        "max_ms": round(float(milliseconds.max()), 3),
+        "histogram": dict(zip(labels, bucket_counts.tolist())),
+    }
+
+
+class StageProfiler:
+    """
+    Records wall time, CPU time, peak RSS and frame latencies per pipeline stage.
+
+    When disabled every call is a no-op. With `use_cprofile` each stage is run under
+    cProfile and the stats of the slowest stage are kept for the report.
+    """
+
+    def __init__(self, enabled: bool = False, use_cprofile: bool = False):
+        self.enabled = enabled
+        self.use_cprofile = enabled and use_cprofile
+        self.stages: list[dict] = []
+        self._latencies: dict[str, list[float]] = {}
+        self._hot_stage: tuple[float, str, cProfile.Profile] | None = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """Profiles the code run inside the context as stage `name`"""
+        if not self.enabled:
+            yield
+            return
+
+        self._latencies = {}
+        profile = cProfile.Profile() if self.use_cprofile else None
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            peak_rss = peak_rss_bytes()
+
+            self.stages.append(
+                {
+                    "stage": name,
+                    "wall_s": round(wall, 4),
+                    # all threads of the process (VapourSynth's included)
+                    "cpu_s": round(cpu, 4),
+                    "peak_rss_mib": round(peak_rss / 1024**2, 1)
+                    if peak_rss is not None
+                    else None,
+                    "latency": {
+                        kind: latency_summary(latencies)
+                        for kind, latencies in self._latencies.items()
+                        if latencies
+                    },
+                }
+            )
+            if profile and (not self._hot_stage or wall > self._hot_stage[0]):
+                self._hot_stage = (wall, name, profile)
+
+    def record_latency(self, kind: str, seconds: float) -> None:
+        """Adds a per-frame latency (i.e. 'decode' or 'encode') to the current stage"""
+        if self.enabled:
+            self._latencies.setdefault(kind, []).append(seconds)
+
+    def report(self, cprofile_name: str | None = None) -> dict:
+        """The stages and their totals (the content of the JSON report)"""
+        total_wall = sum(stage["wall_s"] for stage in self.stages)
+        return {
+            "stages": self.stages,
+            "total": {
+                "wall_s": round(total_wall, 4),
+                "cpu_s": round(sum(stage["cpu_s"] for stage in self.stages), 4),
+                "peak_rss_mib": max(
+                    (
+                        stage["peak_rss_mib"]
+                        for stage in self.stages
+                        if stage["peak_rss_mib"] is not None
+                    ),
+                    default=None,
+                ),
+            },
+            "cpu_count": os.cpu_count(),
+            "cprofile": cprofile_name,
+        }
+
+    def write_report(self, report_path: Path) -> Path | None:
+        """
+        Writes the JSON report (and the hot stage's cProfile stats next to it).
+
+        Returns:
+            (Path | None): Path of the cProfile dump, if one was written
+        """
+        if not self.enabled:
+            return None
+
+        report_path = Path(report_path)
+        profile_path = None
+        if self._hot_stage:
+            _, hot_stage_name, profile = self._hot_stage
+            profile_path = report_path.with_name(f"profile_{hot_stage_name}.prof")
+            profile.dump_stats(profile_path)
+
+        report = self.report(profile_path.name if profile_path else None)
+        temp_path = report_path.with_name(f"{report_path.name}.tmp")
+        temp_path.write_text(json.dumps(report, indent=2))
+        os.replace(temp_path, report_path)
+        return profile_path
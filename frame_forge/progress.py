@@ -0,0 +1,156 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+from typing import TextIO
+
+# completions the frames per second (and ETA) are measured over
+THROUGHPUT_WINDOW = 32
+
+
+def open_progress_stream(target: str) -> TextIO:
+    """
+    Opens the JSON lines target.
+
+    Args:
+        target (str): '-' for stdout, 'fd:N' for an inherited file descriptor or a
+            file path
+
+    Returns:
+        (TextIO): Line buffered text stream
+    """
+    if target == "-":
+        return sys.stdout
+    if target.startswith("fd:"):
+        return os.fdopen(int(target[3:]), "w", buffering=1, encoding="utf-8")
+    return open(Path(target), "w", buffering=1, encoding="utf-8")
+
+
+class ProgressReporter:
+    """
+    Emits machine readable progress events as JSON lines (one object per line with an
+    'event' and a unix 'time' field):
+
+        stage_start   {"stage"}
+        stage_end     {"stage", "seconds", "frames"}
+        frame         {"stage", "frame", "image", "completed", "total", "fps", "eta_s"}
+        complete      {"output"}
+        error         {"message"}
+
+    `fps` is measured over the last few completed frames so it follows the live
+    throughput, `total` counts the frames queued in the stage so far.
+    """
+
+    def __init__(self, stream: TextIO | None = None, quiet: bool = False):
+        """
+        Args:
+            stream (TextIO | None): Stream the events are written to (None disables
+                them)
+            quiet (bool): Drop the human readable output
+        """
+        self.stream = stream
+        self.quiet = quiet
+        self._lock = threading.Lock()
+        self._stage: str | None = None
+        self._stage_start = 0.0
+        self._completed = 0
+        self._total = 0
+        self._completion_times: deque[float] = deque(maxlen=THROUGHPUT_WINDOW)
+
+    @property
+    def enabled(self) -> bool:
+        return self.stream is not None
+
+    @contextmanager
+    def human_output(self):
+        """
+        Routes human readable output (prints) for the duration of the context, it's
+        dropped in quiet mode and moved to stderr when the events go to stdout.
+        """
+        if self.quiet:
+            with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                yield
+        elif self.stream is sys.stdout:
+            with redirect_stdout(sys.stderr):
+                yield
+        else:
+            yield
+
+    def emit(self, event: str, **fields) -> None:
+        """Writes a single event line"""
+        if not self.stream:
+            return
+        line = json.dumps({"event": event, "time": round(time.time(), 3), **fields})
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Emits the start/end events of a stage and tracks its frame completions"""
+        if not self.enabled:
+            yield
+            return
+
+        with self._lock:
+            self._stage = name
+            self._stage_start = time.perf_counter()
+            self._completed = 0
+            self._total = 0
+            self._completion_times.clear()
+        self.emit("stage_start", stage=name)
+        try:
+            yield
+        finally:
+            self.emit(
+                "stage_end",
+                stage=name,
+                seconds=round(time.perf_counter() - self._stage_start, 3),
+                frames=self._completed,
+            )
+            self._stage = None
+
+    def add_frames(self, count: int) -> None:
+        """Adds queued frames to the current stage's total"""
+        with self._lock:
+            self._total += count
+
+    def frame_done(self, frame: int, image: Path) -> None:
+        """Records a completed frame and emits its event with the throughput and ETA"""
+        if not self.enabled:
+            return
+
+        now = time.perf_counter()
+        with self._lock:
+            self._completed += 1
+            self._completion_times.append(now)
+            completed, total = self._completed, self._total
+            window = self._completion_times
+            if len(window) > 1 and window[-1] > window[0]:
+                fps = (len(window) - 1) / (window[-1] - window[0])
+            else:
+                elapsed = now - self._stage_start
+                fps = completed / elapsed if elapsed > 0 else 0.0
+
+        self.emit(
+            "frame",
+            stage=self._stage,
+            frame=frame,
+            image=image.name,
+            completed=completed,
+            total=max(total, completed),
+            fps=round(fps, 3),
+            eta_s=round((total - completed) / fps, 1)
+            if fps > 0 and total > completed
+            else 0.0,
+        )
+
+    def close(self) -> None:
+        """Closes the stream (stdout is left open)"""
+        if self.stream and self.stream not in (sys.stdout, sys.stderr):
+            self.stream.close()
+        self.stream = None
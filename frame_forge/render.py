@@ -0,0 +1,359 @@
+import asyncio
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import vapoursynth as vs
+from awsmfunc import ScreenGenEncoder
+
+from frame_forge.png import PngEncoder
+from frame_forge.png_optimizer import PngOptimizer
+from frame_forge.profiler import StageProfiler
+from frame_forge.progress import ProgressReporter
+from frame_forge.utils import run_async
+
+# built-in (NumPy + zlib) PNG encoder, used alongside awsmfunc's ScreenGenEncoder values
+ZLIB_ENCODER = "zlib"
+
+# thumbnail format -> imwri format (png thumbnails use the same writer as the images)
+THUMBNAIL_FORMATS = {"png": "PNG24", "jpg": "JPEG", "webp": "WEBP"}
+
+# images are written to disk ('files') or kept in memory as PNG bytes or RGB arrays
+OUTPUT_MODES = ("files", "png", "array")
+
+
+class RenderJob(NamedTuple):
+    """A single frame of a clip to be written to `path`"""
+
+    clip: vs.VideoNode
+    frame: int
+    path: Path
+    # a downscaled copy is written here from the same decoded frame
+    thumbnail_path: Path | None = None
+    # the frame of this clip (i.e. before overlays) is handed to the capture callback
+    capture_clip: vs.VideoNode | None = None
+
+
+class ImageResult(NamedTuple):
+    """An image kept in memory instead of being written to `path`"""
+
+    path: Path
+    frame: int
+    # PNG file contents or a (height, width, 3) uint8 RGB array
+    data: bytes | np.ndarray
+    width: int
+    height: int
+
+
+class GenerationResult(NamedTuple):
+    """Images and reports of an in-memory run"""
+
+    images: list[ImageResult]
+    # same content as metrics.json/profile.json, None when they weren't enabled
+    metrics: dict | None = None
+    profile: dict | None = None
+
+
+class DecodeJob(NamedTuple):
+    """A frame that is only decoded (not written) so the decoder keeps reading forward"""
+
+    clip: vs.VideoNode
+    frame: int
+
+
+def frame_to_array(frame: vs.VideoFrame) -> np.ndarray:
+    """Copies a planar 8-bit RGB frame into a (height, width, 3) array"""
+    return np.dstack(
+        [np.asarray(frame[plane]) for plane in range(frame.format.num_planes)]
+    )
+
+
+class RenderEngine:
+    """
+    Renders frames to PNG concurrently.
+
+    Frames are requested with `VideoNode.get_frame_async` through a bounded in-flight
+    window so decoding, overlays and PNG encoding for several frames (and for the
+    source and encode clips) overlap inside VapourSynth's thread pool, instead of
+    walking one frame at a time like `ScreenGen` does.
+    """
+
+    def __init__(
+        self,
+        core: vs.Core,
+        img_lib: ScreenGenEncoder | str,
+        fpng_compression: int,
+        max_in_flight: int | None = None,
+        callback: Callable[[str], None] | None = None,
+        png_encoder: PngEncoder | None = None,
+        optimizer: PngOptimizer | None = None,
+        thumbnail_width: int | None = None,
+        thumbnail_format: str = "png",
+        capture_callback: Callable[[RenderJob, vs.VideoFrame], None] | None = None,
+        profiler: StageProfiler | None = None,
+        progress: ProgressReporter | None = None,
+        output: str = "files",
+    ):
+        self.core = core
+        self.img_lib = img_lib
+        self.fpng_compression = fpng_compression
+        self.max_in_flight = max(1, max_in_flight or core.num_threads)
+        self.callback = callback
+        # finished images are queued for background optimization while rendering goes on
+        self.optimizer = optimizer
+        self.thumbnail_width = thumbnail_width
+        if thumbnail_format not in THUMBNAIL_FORMATS:
+            raise ValueError(
+                f"Thumbnail format must be one of {tuple(THUMBNAIL_FORMATS)}"
+            )
+        self.thumbnail_format = thumbnail_format
+        if output not in OUTPUT_MODES:
+            raise ValueError(f"Output must be one of {OUTPUT_MODES}")
+        if output == "png" and thumbnail_format != "png":
+            raise ValueError("In-memory PNG output only supports png thumbnails")
+        self.output = output
+        # in-memory images by the path they'd have been written to
+        self.images: dict[Path, ImageResult] = {}
+        self.capture_callback = capture_callback
+        # per-frame latencies go to the current stage of the profiler (if enabled)
+        self.profiler = profiler
+        self.progress = progress
+
+        self.png_encoder = None
+        self._write_executor = None
+        if self.img_lib == ZLIB_ENCODER or self.output == "png":
+            self.png_encoder = png_encoder or PngEncoder()
+            # frames are handed off to a couple of writer threads (PNG bands are
+            # compressed on the encoder's own pool) so the event loop keeps requesting
+            self._write_executor = ThreadPoolExecutor(
+                max_workers=2, thread_name_prefix="png_writer"
+            )
+
+        # mirror ScreenGen, fall back to imwri if fpng isn't loaded
+        if self.img_lib == ScreenGenEncoder.fpng and not hasattr(self.core, "fpng"):
+            self.img_lib = ScreenGenEncoder.imwri
+
+        # keyed by id(), the source clip is kept alongside so the id can't be reused
+        self._rgb_nodes: dict[int, tuple[vs.VideoNode, vs.VideoNode]] = {}
+        self._thumbnail_nodes: dict[int, tuple[vs.VideoNode, vs.VideoNode]] = {}
+
+    def render(self, jobs: list[RenderJob]) -> list[Path]:
+        """
+        Renders all jobs concurrently, keeping at most `max_in_flight` frames in flight.
+
+        Args:
+            jobs (list[RenderJob]): Jobs in the order they should be requested
+
+        Returns:
+            list[Path]: Paths of the written images (in job order)
+        """
+        return self.render_sequences([[job] for job in jobs])
+
+    def render_sequences(
+        self, sequences: list[list[RenderJob | DecodeJob]]
+    ) -> list[Path]:
+        """
+        Renders each sequence in order while separate sequences run concurrently. Requests
+        within a sequence are issued in order with only a few in flight, so the decoder
+        reads forward instead of seeking while overlays/PNG encoding still overlap.
+
+        Args:
+            sequences (list[list[RenderJob | DecodeJob]]): Groups of jobs, each group
+                rendered in order
+
+        Returns:
+            list[Path]: Paths of the written images (in job order)
+        """
+        sequences = [sequence for sequence in sequences if sequence]
+        if not sequences:
+            return []
+
+        if self.progress:
+            self.progress.add_frames(
+                sum(
+                    isinstance(job, RenderJob)
+                    for sequence in sequences
+                    for job in sequence
+                )
+            )
+        run_async(self._render_sequences(sequences))
+        return [
+            job.path
+            for sequence in sequences
+            for job in sequence
+            if isinstance(job, RenderJob)
+        ]
+
+    async def _render_sequences(
+        self, sequences: list[list[RenderJob | DecodeJob]]
+    ) -> None:
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        depth = max(1, self.max_in_flight // len(sequences))
+        sequence_limits = [asyncio.Semaphore(depth) for _ in sequences]
+
+        async def run_job(job: RenderJob | DecodeJob, sequence_limit):
+            async with sequence_limit, semaphore:
+                if isinstance(job, RenderJob):
+                    await self._write_frame(job)
+                else:
+                    start = time.perf_counter()
+                    await asyncio.wrap_future(job.clip.get_frame_async(job.frame))
+                    self._record_latency("decode", start)
+
+        # interleave the sequences so they share the in-flight window fairly
+        await asyncio.gather(
+            *[
+                run_job(job, sequence_limit)
+                for jobs in zip_longest(*sequences)
+                for job, sequence_limit in zip(jobs, sequence_limits)
+                if job is not None
+            ]
+        )
+
+    async def _write_frame(self, job: RenderJob) -> None:
+        in_memory = self.output != "files"
+        if not in_memory:
+            job.path.parent.mkdir(parents=True, exist_ok=True)
+        rgb_clip = self._rgb_node(job.clip)
+
+        outputs = [(rgb_clip, job.path)]
+        if job.thumbnail_path and self.thumbnail_width:
+            if not in_memory:
+                job.thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+            outputs.append(
+                (
+                    self._thumbnail_node(rgb_clip, self.thumbnail_width),
+                    job.thumbnail_path,
+                )
+            )
+
+        # both outputs are requested together, VapourSynth shares the single in-flight
+        # request of the decoded/overlaid frame between them
+        await asyncio.gather(
+            *[self._write_output(clip, job.frame, path) for clip, path in outputs],
+            self._capture(job),
+        )
+
+        for _, path in outputs:
+            if self.optimizer and not in_memory and path.suffix == ".png":
+                self.optimizer.submit(path)
+
+        if self.callback:
+            self.callback(f"Writing file: {job.path.name}, frame: {job.frame}")
+        if self.progress:
+            self.progress.frame_done(job.frame, job.path)
+
+    async def _capture(self, job: RenderJob) -> None:
+        if job.capture_clip is None or not self.capture_callback:
+            return
+        frame = await asyncio.wrap_future(job.capture_clip.get_frame_async(job.frame))
+        # the callback may do heavy work (i.e. metrics), keep it off the event loop
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.capture_callback, job, frame
+        )
+
+    async def _write_output(
+        self, rgb_clip: vs.VideoNode, frame: int, path: Path
+    ) -> None:
+        start = time.perf_counter()
+        if self.output != "files":
+            await self._keep_output(rgb_clip, frame, path, start)
+        elif self.png_encoder and path.suffix == ".png":
+            rgb_frame = await asyncio.wrap_future(rgb_clip.get_frame_async(frame))
+            rgb = frame_to_array(rgb_frame)
+            del rgb_frame
+            encode_start = self._record_latency("decode", start)
+            await asyncio.get_running_loop().run_in_executor(
+                self._write_executor, self.png_encoder.write, rgb, path
+            )
+            self._record_latency("encode", encode_start)
+        else:
+            writer = self._writer_node(rgb_clip, path)
+            await asyncio.wrap_future(writer.get_frame_async(frame))
+            # decoding, overlays and encoding all happen inside the writer node
+            self._record_latency("render", start)
+
+    async def _keep_output(
+        self, rgb_clip: vs.VideoNode, frame: int, path: Path, start: float
+    ) -> None:
+        """Keeps the frame in memory (as PNG bytes or an array) instead of writing it"""
+        rgb_frame = await asyncio.wrap_future(rgb_clip.get_frame_async(frame))
+        rgb = frame_to_array(rgb_frame)
+        del rgb_frame
+        data = rgb
+        encode_start = self._record_latency("decode", start)
+        if self.output == "png":
+            data = await asyncio.get_running_loop().run_in_executor(
+                self._write_executor,
+                self.png_encoder.encode,  # pyright: ignore [reportOptionalMemberAccess]
+                rgb,
+            )
+            self._record_latency("encode", encode_start)
+        height, width = rgb.shape[:2]
+        self.images[path] = ImageResult(path, frame, data, width, height)
+
+    def close(self) -> None:
+        """Shuts down the PNG writer threads"""
+        if self._write_executor:
+            self._write_executor.shutdown()
+            self._write_executor = None
+        if self.png_encoder:
+            self.png_encoder.close()
+
+    def _record_latency(self, kind: str, start: float) -> float:
+        """Records the time since `start` with the profiler, returns the current time"""
+        now = time.perf_counter()
+        if self.profiler:
+            self.profiler.record_latency(kind, now - start)
+        return now
+
+    def _rgb_node(self, clip: vs.VideoNode) -> vs.VideoNode:
+        """Converts (and caches) the clip to RGB24 the same way ScreenGen does"""
+        cached = self._rgb_nodes.get(id(clip))
+        if cached:
+            return cached[1]
+
+        rgb_node = self.core.resize.Spline36(
+            clip,
+            format=vs.RGB24,
+            matrix_in_s="709",
+            dither_type="error_diffusion",
+        )
+        self._rgb_nodes[id(clip)] = (clip, rgb_node)
+        return rgb_node
+
+    def _thumbnail_node(
+        self, rgb_clip: vs.VideoNode, thumbnail_width: int
+    ) -> vs.VideoNode:
+        """Downscales (and caches) the RGB clip to the thumbnail width"""
+        cached = self._thumbnail_nodes.get(id(rgb_clip))
+        if cached:
+            return cached[1]
+
+        width = min(thumbnail_width, rgb_clip.width)
+        # keep the aspect ratio, RGB has no subsampling but even sizes suit image hosts
+        height = max(2, round(rgb_clip.height * width / rgb_clip.width / 2) * 2)
+        thumbnail_node = self.core.resize.Spline36(rgb_clip, width=width, height=height)
+        self._thumbnail_nodes[id(rgb_clip)] = (rgb_clip, thumbnail_node)
+        return thumbnail_node
+
+    def _writer_node(self, rgb_clip: vs.VideoNode, path: Path) -> vs.VideoNode:
+        if path.suffix != ".png":
+            return self.core.imwri.Write(
+                rgb_clip,
+                THUMBNAIL_FORMATS[path.suffix.lstrip(".")],
+                str(path),
+                overwrite=True,
+            )
+        if self.img_lib == ScreenGenEncoder.fpng:
+            return self.core.fpng.Write(
+                rgb_clip,
+                filename=str(path),
+                overwrite=True,
+                compression=self.fpng_compression,
+            )
+        return self.core.imwri.Write(rgb_clip, "PNG24", str(path), overwrite=True)
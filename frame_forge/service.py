@@ -0,0 +1,210 @@
+import base64
+import json
+import socket
+import socketserver
+import threading
+from dataclasses import fields
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+from frame_forge.api import FrameForge
+from frame_forge.config import FrameForgeConfig
+from frame_forge.exceptions import FrameForgeError
+from frame_forge.render import GenerationResult
+
+CONFIG_FIELDS = {field.name for field in fields(FrameForgeConfig)}
+
+
+class FrameForgeService:
+    """
+    Runs comparison jobs on a warm `FrameForge` (core, plugins and recently opened
+    source/encode nodes stay loaded between jobs). Jobs run one at a time.
+
+    A job is a JSON object:
+
+        {
+            "source": "path/source.mkv",
+            "encode": "path/encode.mkv",
+            "source_index_path": null,
+            "encode_index_path": null,
+            "options": {"comparison_count": 10}
+        }
+
+    where `options` overrides the service's `FrameForgeConfig` for the job.
+    """
+
+    def __init__(self, forge: FrameForge):
+        self.forge = forge
+        self.jobs_completed = 0
+        self.jobs_failed = 0
+        self.busy = False
+        self._job_lock = threading.Lock()
+
+    def status(self) -> dict:
+        node_cache = self.forge.node_cache
+        return {
+            "busy": self.busy,
+            "jobs_completed": self.jobs_completed,
+            "jobs_failed": self.jobs_failed,
+            "cached_files": node_cache.files() if node_cache else [],
+        }
+
+    def run_job(self, job: dict) -> tuple[HTTPStatus, dict]:
+        """
+        Runs a job.
+
+        Returns:
+            (tuple[HTTPStatus, dict]): Response status and body
+        """
+        error = self.validate(job)
+        if error:
+            return HTTPStatus.BAD_REQUEST, {"error": error}
+
+        with self._job_lock:
+            self.busy = True
+            start = perf_counter()
+            try:
+                result = self.forge.generate(
+                    job["source"],
+                    job["encode"],
+                    source_index_path=job.get("source_index_path"),
+                    encode_index_path=job.get("encode_index_path"),
+                    **job.get("options", {}),
+                )
+            except FrameForgeError as ff_error:
+                self.jobs_failed += 1
+                return HTTPStatus.UNPROCESSABLE_ENTITY, {"error": str(ff_error)}
+            # like the CLI's top level handler, a failed job is reported instead of
+            # taking the service down
+            except Exception as job_error:  # noqa: BLE001
+                self.jobs_failed += 1
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {
+                    "error": f"Unhandled Exception: {job_error}"
+                }
+            finally:
+                self.busy = False
+            self.jobs_completed += 1
+
+        response: dict[str, Any] = {"seconds": round(perf_counter() - start, 3)}
+        if isinstance(result, GenerationResult):
+            response["images"] = [
+                {
+                    "path": image.path.as_posix(),
+                    "frame": image.frame,
+                    "width": image.width,
+                    "height": image.height,
+                    "png": base64.b64encode(image.data).decode("ascii"),  # pyright: ignore [reportArgumentType]
+                }
+                for image in result.images
+            ]
+            response["metrics"] = result.metrics
+            response["profile"] = result.profile
+        else:
+            response["output"] = str(result)
+        return HTTPStatus.OK, response
+
+    @staticmethod
+    def validate(job) -> str | None:
+        """Returns what's wrong with the job, None if it can be run"""
+        if not isinstance(job, dict):
+            return "Job must be a JSON object"
+        for key in ("source", "encode"):
+            if not isinstance(job.get(key), str) or not Path(job[key]).is_file():
+                return f"'{key}' must be the path of an existing file"
+
+        options = job.get("options", {})
+        if not isinstance(options, dict):
+            return "'options' must be a JSON object"
+        unknown = set(options) - CONFIG_FIELDS
+        if unknown:
+            return f"Unknown options: {', '.join(sorted(unknown))}"
+        # arrays can't be sent as JSON, images are returned as base64 PNGs
+        if options.get("output") == "array":
+            return "Output 'array' is only available through the library API"
+        return None
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /jobs runs a job and responds with its output folder (or images),
+    GET /status reports whether a job is running and which files are warm.
+    """
+
+    def do_GET(self):
+        if self.path != "/status":
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+            return
+        self.send_json(HTTPStatus.OK, self.server.service.status())  # pyright: ignore [reportAttributeAccessIssue]
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job = json.loads(self.rfile.read(length))
+        except ValueError:
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": "Invalid JSON"})
+            return
+
+        status, body = self.server.service.run_job(job)  # pyright: ignore [reportAttributeAccessIssue]
+        self.send_json(status, body)
+
+    def send_json(self, status: HTTPStatus, body: dict) -> None:
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def address_string(self) -> str:
+        # unix socket clients have no address
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+
+    class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+def serve(address: str, service: FrameForgeService) -> None:
+    """
+    Serves jobs until interrupted.
+
+    Args:
+        address (str): 'unix:PATH' for a Unix socket, otherwise '[HOST:]PORT' (the host
+            defaults to 127.0.0.1)
+        service (FrameForgeService): Service running the jobs
+    """
+    socket_path = None
+    if address.startswith("unix:"):
+        if not hasattr(socket, "AF_UNIX"):
+            raise FrameForgeError("Unix sockets aren't supported on this platform")
+        socket_path = Path(address[5:])
+        socket_path.unlink(missing_ok=True)
+        server = UnixHTTPServer(str(socket_path), JobRequestHandler)
+    else:
+        host, _, port = address.rpartition(":")
+        try:
+            server = ThreadingHTTPServer(
+                (host or "127.0.0.1", int(port)), JobRequestHandler
+            )
+        except ValueError:
+            raise FrameForgeError(f"Invalid service address: {address}") from None
+
+    server.service = service  # pyright: ignore [reportAttributeAccessIssue]
+    print(f"FrameForge service listening on {address}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path:
+            socket_path.unlink(missing_ok=True)
@@ -0,0 +1,99 @@
+import numpy as np
+import vapoursynth as vs
+
+# noise planes cycled through the frames (kept small, a 4K plane is ~8 MiB)
+NOISE_POOL = 4
+
+
+def synthetic_clip(
+    core: vs.Core,
+    width: int = 1920,
+    height: int = 1080,
+    length: int = 2400,
+    fpsnum: int = 24000,
+    fpsden: int = 1001,
+    scene_length: int = 240,
+    gop_size: int = 240,
+    pict_pattern: str = "PBBB",
+    content_seed: int = 0,
+    noise_seed: int = 0,
+) -> vs.VideoNode:
+    """
+    Builds a YUV420P8 clip with scene changes, motion and noise plus the frame props the
+    pipeline reads from real sources (`_PictType`, `_Key`, `_AbsoluteTime`).
+
+    Clips built with the same `content_seed` show the same content, a different
+    `noise_seed` stands in for encoding loss (i.e. a source/encode pair).
+
+    Args:
+        core (vs.Core): VapourSynth core
+        width (int): Width
+        height (int): Height
+        length (int): Number of frames
+        fpsnum (int): Frame rate numerator
+        fpsden (int): Frame rate denominator
+        scene_length (int): Frames per scene (each scene has its own brightness)
+        gop_size (int): Keyframe interval, every GOP starts with an 'I' frame
+        pict_pattern (str): Picture types repeated after each 'I' frame
+        content_seed (int): Seed of the scene content
+        noise_seed (int): Seed of the noise
+
+    Returns:
+        (vs.VideoNode): The synthetic clip
+    """
+    blank = core.std.BlankClip(
+        width=width,
+        height=height,
+        format=vs.YUV420P8,
+        length=length,
+        fpsnum=fpsnum,
+        fpsden=fpsden,
+        color=[16, 128, 128],
+        keep=False,
+    )
+
+    content_rng = np.random.default_rng(content_seed)
+    scene_levels = content_rng.integers(40, 200, -(-length // scene_length))
+    gradient = np.linspace(-30, 30, width, dtype=np.float32)
+
+    noise_rng = np.random.default_rng(noise_seed)
+    noise_pool = noise_rng.integers(-12, 13, (NOISE_POOL, height, width), dtype=np.int8)
+
+    def pict_type(n: int) -> str:
+        gop_position = n % gop_size
+        if not gop_position:
+            return "I"
+        return pict_pattern[(gop_position - 1) % len(pict_pattern)]
+
+    def render(n: int, f: vs.VideoFrame) -> vs.VideoFrame:
+        frame = f.copy()
+        scene = n // scene_length
+        # the gradient pans in alternating directions per scene
+        pan = (n % scene_length) * 4 * (1 if scene % 2 else -1)
+        row = scene_levels[scene] + np.roll(gradient, pan)
+        np.asarray(frame[0])[:] = np.clip(
+            row[np.newaxis, :] + noise_pool[n % NOISE_POOL], 16, 235
+        )
+
+        frame.props["_PictType"] = pict_type(n)
+        frame.props["_Key"] = int(n % gop_size == 0)
+        frame.props["_AbsoluteTime"] = n * fpsden / fpsnum
+        frame.props["_DurationNum"] = fpsden
+        frame.props["_DurationDen"] = fpsnum
+        return frame
+
+    return core.std.ModifyFrame(blank, blank, render)
+
+
+def synthetic_pair(
+    core: vs.Core, width: int = 1920, height: int = 1080, length: int = 2400, **kwargs
+) -> tuple[vs.VideoNode, vs.VideoNode]:
+    """
+    Builds a matching source/encode pair (same content, different noise).
+
+    Returns:
+        (tuple[vs.VideoNode, vs.VideoNode]): Source and encode clips
+    """
+    source = synthetic_clip(core, width, height, length, noise_seed=0, **kwargs)
+    encode = synthetic_clip(core, width, height, length, noise_seed=1, **kwargs)
+    return source, encode
@@ -1,8 +1,12 @@
 import asyncio
+import hashlib
 import sys
 from argparse import ArgumentTypeError
+from functools import lru_cache
 from pathlib import Path
 
+from frame_forge.exceptions import FrameForgeError
+
 
 def exit_application(msg: str, exit_code: int = 0):
     """A clean way to exit the program without raising traceback errors
@@ -39,6 +43,16 @@ def get_working_dir():
         return Path.cwd()
 
 
+def load_plugins(core) -> None:
+    """Loads all VapourSynth plugins from the 'img_plugins' directory into the core"""
+    plugin_path = get_working_dir() / "img_plugins"
+    if not plugin_path.is_dir() and not plugin_path.exists():
+        raise FrameForgeError("Can not detect plugin directory")
+    else:
+        for plugin in plugin_path.glob("*.dll"):
+            core.std.LoadPlugin(Path(plugin).resolve())
+
+
 def hex_to_bgr(hex_code):
     # Remove the '#' if present
     hex_code = hex_code.lstrip("#")
@@ -71,3 +85,40 @@ def run_async(coro):
     # no event loop is running, use `asyncio.run()`
     except RuntimeError:
         return asyncio.run(coro)
+
+
+def partial_file_hash(file_path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Fast content fingerprint of a (large) file, hashes the file size along with
+    chunks from the start, middle and end instead of reading the whole file.
+
+    Results are memoised on the path, size and modification time, so the stages of a
+    run (index cache, frame type cache, drift map) share a single read per file.
+
+    Args:
+        file_path (Path): File to fingerprint
+        chunk_size (int): Bytes to read for each sampled chunk
+
+    Returns:
+        (str): Hex digest
+    """
+    file_path = Path(file_path).resolve()
+    stat = file_path.stat()
+    return _partial_file_hash(file_path, stat.st_size, stat.st_mtime_ns, chunk_size)
+
+
+@lru_cache(maxsize=64)
+def _partial_file_hash(
+    file_path: Path, file_size: int, _mtime_ns: int, chunk_size: int
+) -> str:
+    digest = hashlib.blake2b(str(file_size).encode(), digest_size=16)
+    offsets = {
+        0,
+        max(0, file_size // 2 - chunk_size // 2),
+        max(0, file_size - chunk_size),
+    }
+    with open(file_path, "rb") as media:
+        for offset in sorted(offsets):
+            media.seek(offset)
+            digest.update(media.read(chunk_size))
+    return digest.hexdigest()